@@ -0,0 +1,96 @@
+"""Shared helpers for the PowerPack benchmarks."""
+
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+PACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_comfyui_path(path=None):
+    '''Put a ComfyUI checkout (--comfyui / COMFYUI_PATH) on sys.path.'''
+    path = path or os.environ.get("COMFYUI_PATH")
+    if path:
+        path = os.path.abspath(path)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return path
+
+
+def comfyui_or_stubs(path=None):
+    '''Use a ComfyUI checkout when given, otherwise the stub modules. Returns a scratch dir.'''
+    import tempfile
+
+    if add_comfyui_path(path):
+        return tempfile.mkdtemp(prefix="cmnl-bench-")
+    import _stubs
+    return _stubs.install()
+
+
+def load_powerpack():
+    '''Import the pack from its folder (the folder name is not a valid module name).'''
+    if "cmnl_powerpack" in sys.modules:
+        return sys.modules["cmnl_powerpack"]
+    spec = importlib.util.spec_from_file_location(
+        "cmnl_powerpack",
+        os.path.join(PACK_DIR, "__init__.py"),
+        submodule_search_locations=[PACK_DIR],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["cmnl_powerpack"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def timeit(fn, repeat: int = 5, warmup: int = 1) -> dict:
+    '''Time fn() `repeat` times; the nodes' console prints are swallowed so stdout stays JSON.'''
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+    return {
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+    }
+
+
+def pack_version():
+    '''POWERPACK_VERSION, read from __init__.py when the pack isn't imported in this process.'''
+    pack = sys.modules.get("cmnl_powerpack")
+    if pack is not None:
+        return getattr(pack, "POWERPACK_VERSION", None)
+    import re
+    with open(os.path.join(PACK_DIR, "__init__.py"), encoding="utf-8") as f:
+        m = re.search(r'^POWERPACK_VERSION = "([^"]+)"', f.read(), re.M)
+    return m.group(1) if m else None
+
+
+def emit(suite: str, results, out=None):
+    '''Print results as JSON (and write them to `out` when given).'''
+    doc = {
+        "suite": suite,
+        "powerpack_version": pack_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2)
+    print(text)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return doc
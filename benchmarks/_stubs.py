@@ -0,0 +1,74 @@
+"""
+Minimal stand-ins for ComfyUI's `folder_paths` and `comfy` modules, so the
+pack can be imported and benchmarked on a CPU-only box without ComfyUI.
+Only what the pack touches at import time and in the benchmarked paths.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+
+def install(root=None):
+    '''Register stub modules in sys.modules. Returns the scratch root directory.'''
+    if "folder_paths" in sys.modules:
+        return getattr(sys.modules["folder_paths"], "STUB_ROOT", None)
+
+    root = root or tempfile.mkdtemp(prefix="cmnl-bench-")
+    models = os.path.join(root, "models")
+
+    fp = types.ModuleType("folder_paths")
+    fp.STUB_ROOT = root
+
+    def get_folder_paths(kind):
+        return [os.path.join(models, kind)]
+
+    def get_filename_list(kind):
+        d = os.path.join(models, kind)
+        if not os.path.isdir(d):
+            return []
+        return sorted(
+            os.path.relpath(os.path.join(dp, f), d)
+            for dp, _, files in os.walk(d) for f in files
+        )
+
+    def get_full_path(kind, name):
+        path = os.path.join(models, kind, name)
+        return path if os.path.isfile(path) else None
+
+    fp.get_folder_paths = get_folder_paths
+    fp.get_filename_list = get_filename_list
+    fp.get_full_path = get_full_path
+    fp.get_output_directory = lambda: os.path.join(root, "output")
+    fp.get_user_directory = lambda: os.path.join(root, "user")
+    fp.get_temp_directory = lambda: os.path.join(root, "temp")
+
+    comfy = types.ModuleType("comfy")
+    comfy.__path__ = []
+    utils = types.ModuleType("comfy.utils")
+    sd = types.ModuleType("comfy.sd")
+
+    def load_torch_file(path, safe_load=False, device=None):
+        import safetensors.torch
+        return safetensors.torch.load_file(path)
+
+    def load_lora_for_models(model, clip, lora, strength_model, strength_clip):
+        return model, clip
+
+    def load_diffusion_model(path, model_options={}):
+        return load_torch_file(path)
+
+    utils.load_torch_file = load_torch_file
+    sd.load_lora_for_models = load_lora_for_models
+    sd.load_diffusion_model = load_diffusion_model
+    comfy.utils = utils
+    comfy.sd = sd
+
+    sys.modules.update({
+        "folder_paths": fp,
+        "comfy": comfy,
+        "comfy.utils": utils,
+        "comfy.sd": sd,
+    })
+    return root
@@ -0,0 +1,88 @@
+"""
+Pack import time, measured in fresh interpreters (what ComfyUI pays per restart).
+
+Torch is imported before the pack, as ComfyUI does before loading custom nodes.
+Exits non-zero when the median import exceeds --max-ms (default 50, 0 = no limit),
+or when the pack itself imported a library that should only load on first use
+(requests, PIL, numpy).
+
+    python benchmarks/bench_import.py --repeat 10 --max-ms 50
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from _common import emit
+
+LAZY_MODULES = ("requests", "PIL", "numpy")
+DEFAULT_MAX_MS = 50.0
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {bench_dir!r})
+from _common import comfyui_or_stubs, load_powerpack
+comfyui_or_stubs({comfyui!r})
+if {torch!r}:
+    import torch
+import io, contextlib
+before = set(sys.modules)
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    load_powerpack()
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"import_s": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules and m not in before]}}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--no-torch", action="store_true", help="don't import torch before the pack")
+    ap.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS,
+                    help=f"fail when the median import is slower (default {DEFAULT_MAX_MS:g}, 0 = no limit)")
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    code = CHILD.format(
+        bench_dir=os.path.dirname(os.path.abspath(__file__)),
+        comfyui=args.comfyui,
+        torch=not args.no_torch,
+        lazy=LAZY_MODULES,
+    )
+    env = dict(os.environ, CMNL_PRELOAD="0", CMNL_LIST_REFRESH_S="0")
+    samples, loaded = [], set()
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(row["import_s"])
+        loaded.update(row["loaded"])
+
+    median_ms = statistics.median(samples) * 1000
+    results = {
+        "repeat": args.repeat,
+        "torch_preloaded": not args.no_torch,
+        "min_ms": min(samples) * 1000,
+        "median_ms": median_ms,
+        "max_ms": max(samples) * 1000,
+        "eager_imports": sorted(loaded),
+        "threshold_ms": args.max_ms or None,
+    }
+    emit("import", results, args.out)
+
+    failed = []
+    if loaded:
+        failed.append(f"imported with the pack: {', '.join(sorted(loaded))}")
+    if args.max_ms and median_ms > args.max_ms:
+        failed.append(f"median import {median_ms:.1f} ms > {args.max_ms:.1f} ms")
+    if failed:
+        print("FAIL: " + "; ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
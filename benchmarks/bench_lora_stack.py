@@ -0,0 +1,68 @@
+"""
+Multi-LoRA stacking: chained load_lora_for_models calls vs one merged pass.
+
+Needs a ComfyUI checkout and real model files:
+
+    python benchmarks/bench_lora_stack.py --comfyui ~/ComfyUI \
+        --checkpoint sdxl.safetensors --loras a.safetensors b.safetensors c.safetensors
+"""
+
+import argparse
+
+from _common import add_comfyui_path, emit, load_powerpack, timeit
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: $COMFYUI_PATH)")
+    ap.add_argument("--checkpoint", required=True, help="checkpoint name in models/checkpoints")
+    ap.add_argument("--loras", nargs="+", required=True, help="LoRA names in models/loras")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--apply", action="store_true", help="also time patch_model()/unpatch_model()")
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    add_comfyui_path(args.comfyui)
+    import comfy.sd
+    import comfy.utils
+    import folder_paths
+
+    pp = load_powerpack()
+
+    ckpt_path = folder_paths.get_full_path("checkpoints", args.checkpoint)
+    model, clip = comfy.sd.load_checkpoint_guess_config(
+        ckpt_path, output_vae=False, output_clipvision=False,
+        embedding_directory=folder_paths.get_folder_paths("embeddings"),
+    )[:2]
+    loras = [
+        comfy.utils.load_torch_file(folder_paths.get_full_path("loras", name), safe_load=True)
+        for name in args.loras
+    ]
+
+    def chained():
+        m, c = model, clip
+        for sd in loras:
+            m, c = comfy.sd.load_lora_for_models(m, c, dict(sd), 1.0, 1.0)
+        return m, c
+
+    def merged():
+        return pp.lora._cmnl_apply_lora_stack(model, clip, [(dict(sd), 1.0, 1.0) for sd in loras])
+
+    results = {"loras": len(loras)}
+    for name, fn in (("chained", chained), ("merged", merged)):
+        results[name] = timeit(fn, repeat=args.repeat)
+        if args.apply:
+            m, _ = fn()
+
+            def apply():
+                m.patch_model()
+                m.unpatch_model()
+
+            results[name + "_apply"] = timeit(apply, repeat=args.repeat)
+
+    results["speedup"] = results["chained"]["median_s"] / max(results["merged"]["median_s"], 1e-9)
+    emit("lora_stack", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+PowerRes.make across batch sizes: preset lookup and empty-latent allocation.
+
+    python benchmarks/bench_power_res.py --batch 1 4 16 64
+"""
+
+import argparse
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--batch", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--size", type=int, default=1024, help="square manual_override size")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+    import torch
+
+    node = pp.PowerRes()
+    presets = pp.power_res._CMNL_PRESETS.check()
+    preset = next(iter(presets), "(no presets found)")
+
+    results = []
+    for batch in args.batch:
+        for fmt in ("SD1.5/SDXL (4ch)", "SD3/Flux (16ch)"):
+            def manual():
+                return node.make(preset, True, args.size, args.size, batch, latent_format=fmt)
+
+            # what an uncached node allocates per run (shape taken once, outside the timing)
+            shape = list(manual()[0]["samples"].shape)
+
+            def fresh_zeros():
+                return torch.zeros(shape)
+
+            results.append({
+                "batch": batch,
+                "latent_format": fmt,
+                "size": args.size,
+                "preset": timeit(lambda: node.make(preset, False, 512, 512, batch, latent_format=fmt), args.repeat),
+                "manual_override": timeit(manual, args.repeat),
+                "torch_zeros_reference": timeit(fresh_zeros, args.repeat),
+            })
+
+    emit("power_res", {"preset": preset, "runs": results}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+PowerRes presets: parsing presets/*.json on every call vs the cached registry,
+and PowerRes.make resolving a preset from the registry (no filesystem access).
+
+    python benchmarks/bench_presets.py --presets 1000 --files 1 10 100
+"""
+
+import argparse
+import json
+import os
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+
+
+def write_presets(pdir: str, presets: int, files: int):
+    os.makedirs(pdir, exist_ok=True)
+    per_file = max(1, presets // files)
+    n = 0
+    for f in range(files):
+        data = {}
+        for _ in range(per_file):
+            data[f"Preset {n:05d}"] = [512 + 8 * (n % 200), 512 + 8 * ((n * 7) % 200)]
+            n += 1
+        with open(os.path.join(pdir, f"bench_{f:04d}.json"), "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--presets", type=int, default=1000)
+    ap.add_argument("--files", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    scratch = comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+
+    results = []
+    for files in args.files:
+        pdir = os.path.join(scratch, f"presets_{files}")
+        total = write_presets(pdir, args.presets, files)
+        name = next(iter(pp.power_res._cmnl_load_res_presets(pdir)))
+
+        checked = pp.power_res._CmnlPresetRegistry(pdir, interval=0)  # re-stat on every call
+        throttled = pp.power_res._CmnlPresetRegistry(pdir, interval=3600)
+        throttled.check()
+
+        # make() reads the module registry; point it at the benchmark folder for the timing
+        node = pp.PowerRes()
+        saved, pp.power_res._CMNL_PRESETS = pp.power_res._CMNL_PRESETS, throttled
+        try:
+            make = timeit(lambda: node.make(name, False, 512, 512, 1), args.repeat)
+        finally:
+            pp.power_res._CMNL_PRESETS = saved
+
+        results.append({
+            "files": files,
+            "presets": total,
+            "parse_every_call": timeit(lambda: pp.power_res._cmnl_load_res_presets(pdir), args.repeat),
+            "registry_signature_check": timeit(checked.check, args.repeat),
+            "registry_throttled": timeit(throttled.check, args.repeat),
+            "make": make,
+        })
+
+    emit("presets", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
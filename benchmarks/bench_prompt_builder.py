@@ -0,0 +1,104 @@
+"""
+PowerPromptBuilder against a local mock of the Responses API (no network, no key):
+API round trip, response cache hit, streaming, and the batch node's concurrency.
+
+    python benchmarks/bench_prompt_builder.py --latency-ms 50 --batch 32 --concurrency 1 4 16
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+
+
+class MockResponses(BaseHTTPRequestHandler):
+    '''POST /v1/responses → echoes the user text after `latency` seconds (SSE when stream=true).'''
+
+    latency = 0.05
+    requests = 0
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        type(self).requests += 1
+        time.sleep(self.latency)
+        text = "expanded: " + body["input"][-1]["content"][0]["text"]
+        if body.get("stream"):
+            events = [{"type": "response.output_text.delta", "delta": w + " "} for w in text.split()]
+            events.append({"type": "response.output_text.done", "text": text})
+            data = "".join(f"data: {json.dumps(e)}\n\n" for e in events).encode("utf-8")
+            ctype = "text/event-stream"
+        else:
+            data = json.dumps({"output_text": text}).encode("utf-8")
+            ctype = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--latency-ms", type=float, default=50, help="mock server think time per request")
+    ap.add_argument("--batch", type=int, default=32, help="prompts for the batch node")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    scratch = comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+    # keep the benchmark's responses out of the real prompt cache
+    pp.prompt_builder._CMNL_RESPONSE_CACHE.path = os.path.join(scratch, "bench_prompt_cache.sqlite3")
+
+    MockResponses.latency = args.latency_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockResponses)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    settings = dict(instructions="Expand the prompt.", model="gpt-5-mini", custom_model="", temperature=0.0,
+                    max_output_tokens=256, force_clean_output=True, api_key_override="bench", base_url=base_url)
+    node = pp.PowerPromptBuilder()
+    batch_node = pp.PowerPromptBuilderBatch()
+    prompts = "\n".join(f"a cat number {i}" for i in range(args.batch))
+
+    try:
+        results = {
+            "latency_ms": args.latency_ms,
+            "api": timeit(lambda: node.run("a cat", bypass_cache=True, **settings), args.repeat),
+            "api_stream": timeit(lambda: node.run("a cat", bypass_cache=True, stream=True, **settings), args.repeat),
+            "cache_hit": timeit(lambda: node.run("a cat", **settings), args.repeat),
+            "batch": [],
+        }
+        for concurrency in args.concurrency:
+            def batch():
+                return batch_node.run_batch(
+                    [prompts], [concurrency], [0], bypass_cache=[True], **{k: [v] for k, v in settings.items()}
+                )
+
+            stats = timeit(batch, max(1, args.repeat // 5))
+            results["batch"].append({
+                "prompts": args.batch,
+                "concurrency": concurrency,
+                "run": stats,
+                "prompts_per_s": args.batch / max(stats["median_s"], 1e-9),
+            })
+        results["server_requests"] = MockResponses.requests
+    finally:
+        server.shutdown()
+
+    emit("prompt_builder", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
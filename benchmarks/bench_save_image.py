@@ -0,0 +1,77 @@
+"""
+PowerSaveImage.save end to end (convert, encode, write) per size and format,
+with and without the full-flow outputs.
+
+    python benchmarks/bench_save_image.py --sizes 1024 2048 4096 --formats PNG JPEG
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+from bench_save_metadata import make_graph
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1024, 2048, 4096], help="square image sizes")
+    ap.add_argument("--formats", nargs="+", default=["PNG", "JPEG"])
+    ap.add_argument("--profile", default="balanced", help="compression_profile")
+    ap.add_argument("--nodes", type=int, default=200, help="workflow graph size for the full flow")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+    import folder_paths
+    import torch
+
+    node = pp.PowerSaveImage()
+    prompt, extra = make_graph(args.nodes)
+    sub = "cmnl_bench_save"
+    out_root = os.path.join(folder_paths.get_output_directory(), sub)
+
+    results = []
+    try:
+        for size in args.sizes:
+            image = torch.rand(1, size, size, 3, generator=torch.Generator().manual_seed(size))
+            for fmt in args.formats:
+                for full_flow in (False, True):
+                    def save():
+                        node.save(
+                            image, f"{sub}/share", f"{sub}/full", True, full_flow, "bench", fmt,
+                            positive_prompt="a photo", seed=1, steps=30, cfg=5.5, width=size, height=size,
+                            compression_profile=args.profile, prompt=prompt, extra_pnginfo=extra,
+                        )
+
+                    stats = timeit(save, args.repeat)
+                    # one more save into an empty folder: the bytes a single save writes
+                    shutil.rmtree(out_root, ignore_errors=True)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        save()
+                    written = sum(
+                        os.path.getsize(os.path.join(dp, f))
+                        for dp, _, files in os.walk(out_root) for f in files
+                    )
+                    shutil.rmtree(out_root, ignore_errors=True)
+                    results.append({
+                        "size": size,
+                        "format": fmt,
+                        "full_flow": full_flow,
+                        "save": stats,
+                        "megapixels_per_s": size * size / 1e6 / max(stats["median_s"], 1e-9),
+                        "bytes_per_save": written,
+                    })
+    finally:
+        shutil.rmtree(out_root, ignore_errors=True)
+
+    emit("save_image", {"profile": args.profile, "nodes": args.nodes, "runs": results}, args.out)
+
+
+if __name__ == "__main__":
+    main()
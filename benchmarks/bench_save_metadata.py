@@ -0,0 +1,102 @@
+"""
+PowerSaveImage with share + full flow on and a large workflow graph:
+the previous two-PNG / double-json path vs the current one
+(one pixel compression, JSON serialized once).
+
+    python benchmarks/bench_save_metadata.py --nodes 200 1000 5000
+"""
+
+import argparse
+import json
+import os
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+
+
+def make_graph(nodes: int):
+    '''Synthetic prompt + workflow roughly shaped like ComfyUI's.'''
+    prompt = {
+        str(i): {
+            "class_type": "KSampler",
+            "inputs": {"seed": i, "steps": 30, "cfg": 5.5, "model": [str(i - 1), 0], "text": "x" * 200},
+        }
+        for i in range(nodes)
+    }
+    workflow = {
+        "nodes": [
+            {"id": i, "type": "KSampler", "pos": [i, i], "size": [300, 200],
+             "widgets_values": [i, "fixed", 30, 5.5, "euler", "normal", 1.0]}
+            for i in range(nodes)
+        ],
+        "links": [[i, i - 1, 0, i, 0, "MODEL"] for i in range(1, nodes)],
+    }
+    return prompt, {"workflow": workflow}
+
+
+def baseline(pixels, parameters, prompt, extra, out_dir, png_opts):
+    '''The pre-optimization path: each PNG compressed separately, JSON dumped twice.'''
+    from PIL import Image, PngImagePlugin
+
+    pil_img = Image.fromarray(pixels)
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", parameters)
+    pil_img.save(os.path.join(out_dir, "base_share.png"), pnginfo=info, **png_opts)
+
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", parameters)
+    info.add_text("prompt", json.dumps(prompt))
+    info.add_text("workflow", json.dumps(extra["workflow"]))
+    pil_img.save(os.path.join(out_dir, "base_full.png"), pnginfo=info, **png_opts)
+
+    dump = {"parameters": parameters, "prompt": prompt, "workflow": extra["workflow"], "extra_pnginfo": extra}
+    with open(os.path.join(out_dir, "base_workflow.txt"), "w", encoding="utf-8") as f:
+        json.dump(dump, f, indent=2)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--nodes", type=int, nargs="+", default=[200, 1000, 5000])
+    ap.add_argument("--size", type=int, default=1024, help="square image size")
+    ap.add_argument("--profile", default="balanced", help="compression profile used by both paths")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    scratch = comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+    import numpy as np
+
+    out_dir = os.path.join(scratch, "bench_save_metadata")
+    os.makedirs(out_dir, exist_ok=True)
+    pixels = np.random.default_rng(0).integers(0, 256, (args.size, args.size, 3), dtype=np.uint8)
+    parameters = "a photo\nNegative prompt: blurry\nSteps: 30, Sampler: euler, CFG scale: 5.5, Seed: 1"
+    node = pp.PowerSaveImage()
+    profile = pp.save_image._CMNL_ENCODE_PROFILES[args.profile]
+    png_opts = profile["png"]
+    encode = {"format": "PNG", "jpeg_quality": 95, "webp_quality": 90, "profile": profile}
+
+    results = []
+    for nodes in args.nodes:
+        prompt, extra = make_graph(nodes)
+
+        def current():
+            flow = pp.save_image._CmnlFlowJson(prompt, extra)
+            staged = node._encode_outputs(pixels, parameters, out_dir, out_dir, "cur", "", encode, flow)
+            staged += node._encode_workflow_txt(parameters, out_dir, "cur", flow)
+            node._publish("cur", staged)
+
+        row = {
+            "nodes": nodes,
+            "workflow_json_bytes": len(json.dumps(extra["workflow"])),
+            "baseline": timeit(lambda: baseline(pixels, parameters, prompt, extra, out_dir, png_opts), args.repeat),
+            "current": timeit(current, args.repeat),
+        }
+        row["speedup"] = row["baseline"]["median_s"] / max(row["current"]["median_s"], 1e-9)
+        results.append(row)
+
+    emit("save_metadata", {"size": args.size, "profile": args.profile, "runs": results}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+PowerTextConcat.run with many connected text inputs, and the batch node's
+capped product over large option lists.
+
+    python benchmarks/bench_text_concat.py --inputs 10 50 --chars 40 400 --max-count 256 4096
+"""
+
+import argparse
+
+from _common import comfyui_or_stubs, emit, load_powerpack, timeit
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--inputs", type=int, nargs="+", default=[10, 50], help="connected text_N inputs (max 50)")
+    ap.add_argument("--chars", type=int, nargs="+", default=[40, 400], help="characters per input")
+    ap.add_argument("--max-count", type=int, nargs="+", default=[256, 4096], help="batch node max_count")
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--out", default=None, help="write JSON results to this file")
+    args = ap.parse_args()
+
+    comfyui_or_stubs(args.comfyui)
+    pp = load_powerpack()
+    node = pp.PowerTextConcat()
+
+    results = []
+    for inputs in args.inputs:
+        for chars in args.chars:
+            texts = {f"text_{i}": f"  part {i} " + "x" * chars + "  " for i in range(1, min(inputs, 50) + 1)}
+            for strip in (True, False):
+                results.append({
+                    "inputs": len(texts),
+                    "chars": chars,
+                    "strip_parts": strip,
+                    "run": timeit(lambda: node.run(", ", strip, trigger="trigger word", **texts), args.repeat),
+                })
+
+    # 3 inputs × 1000 options = 10^9 combinations; only max_count of them are built
+    batch_node = pp.PowerTextConcatBatch()
+    columns = {f"text_{i}": [f"option {i}.{j}" for j in range(1000)] for i in range(1, 4)}
+    batch = []
+    for cap in args.max_count:
+        batch.append({
+            "mode": "product",
+            "combinations": 1000 ** 3,
+            "max_count": cap,
+            "run": timeit(lambda: batch_node.run_batch([", "], [True], ["product"], [cap], **columns),
+                          max(1, args.repeat // 20)),
+        })
+
+    emit("text_concat", {"run": results, "batch": batch}, args.out)
+
+
+if __name__ == "__main__":
+    main()
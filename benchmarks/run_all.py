@@ -0,0 +1,67 @@
+"""
+Run every benchmark that works without ComfyUI or a GPU and collect one JSON report
+(keep one per release and diff them to spot regressions).
+
+    python benchmarks/run_all.py --out bench-1.0.3.json
+    python benchmarks/run_all.py --quick
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from _common import emit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# script -> (full args, --quick args)
+SUITES = {
+    # import-time regression gate: fails the run when the median import exceeds the budget
+    "bench_import.py": (["--max-ms", "50"], ["--repeat", "3", "--max-ms", "50"]),
+    "bench_text_concat.py": ([], ["--repeat", "20"]),
+    "bench_presets.py": ([], ["--files", "1", "10", "--repeat", "5"]),
+    "bench_power_res.py": ([], ["--batch", "1", "16", "--repeat", "5"]),
+    "bench_save_image.py": ([], ["--sizes", "1024", "--repeat", "1"]),
+    "bench_save_metadata.py": ([], ["--nodes", "200", "--size", "512", "--repeat", "2"]),
+    "bench_prompt_builder.py": ([], ["--repeat", "3", "--batch", "8", "--concurrency", "1", "4"]),
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--comfyui", default=None, help="ComfyUI checkout (default: stub modules)")
+    ap.add_argument("--quick", action="store_true", help="small sizes / few repeats (smoke run)")
+    ap.add_argument("--only", nargs="+", default=None, help="script names to run")
+    ap.add_argument("--out", default=None, help="write the combined JSON report to this file")
+    args = ap.parse_args()
+
+    env = dict(os.environ, CMNL_PRELOAD="0")
+    report, failed = {}, []
+    for script, (full, quick) in SUITES.items():
+        if args.only and script not in args.only and script[:-3] not in args.only:
+            continue
+        with tempfile.TemporaryDirectory(prefix="cmnl-bench-") as tmp:
+            out = os.path.join(tmp, "result.json")
+            cmd = [sys.executable, os.path.join(HERE, script), "--out", out] + (quick if args.quick else full)
+            if args.comfyui and script != "bench_import.py":
+                cmd += ["--comfyui", args.comfyui]
+            print(f"running {script} ...", file=sys.stderr)
+            proc = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if proc.returncode != 0 or not os.path.exists(out):
+                failed.append(script)
+                report[script[:-3]] = {"error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+                continue
+            with open(out, encoding="utf-8") as f:
+                report[script[:-3]] = json.load(f)["results"]
+
+    emit("all", report, args.out)
+    if failed:
+        print(f"FAIL: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Shared helpers for the PowerPack nodes: logging, env settings, server access, model file lists."""
+
+import logging
+import os
+import threading
+import time
+
+import folder_paths
+
+LORA_CFG = "LORA_CFG"
+
+_logger = logging.getLogger("CornmeisterNL Powerpack")
+
+def _log_magenta(msg: str):
+    magenta = "\033[1;38;5;201m"
+    reset = "\033[0m"
+    _logger.info(f"{magenta}⚡ [CornmeisterNL Powerpack]{reset} {msg}")
+
+def _cmnl_prompt_server():
+    '''The running ComfyUI PromptServer, or None (scripts, benchmarks).'''
+    try:
+        from server import PromptServer
+        return PromptServer.instance
+    except Exception:
+        return None
+
+
+def _cmnl_env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _cmnl_file_fingerprint(kind: str, name) -> str:
+    '''"path:mtime_ns:size" of a model file for IS_CHANGED (one stat, the file is never read).'''
+    if not isinstance(name, str) or not name or (name.startswith("(") and name.endswith(")")):
+        return ""
+    path = folder_paths.get_full_path(kind, name)
+    try:
+        st = os.stat(path) if path else None
+    except OSError:
+        st = None
+    if st is None:
+        return f"{name}:missing"
+    return f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+class _CmnlFileLists:
+    '''
+    In-memory model filename lists for INPUT_TYPES (loras, unet).
+    - get() answers from memory; only the first call per folder lists synchronously
+    - get() re-stats the folder roots (no listing) when the last check is older than `ttl`,
+      so files copied straight into a root show up right away; subfolders are left to the thread
+    - a daemon thread re-lists a folder when the mtime of one of its roots
+      (or their direct subfolders) changed, and every `full_every` ticks regardless
+    - refresh() re-lists right away (route: POST /cmnl_powerpack/lists/refresh, called
+      by the frontend's Refresh before it reloads the node definitions)
+    '''
+
+    def __init__(self, interval: float = 30.0, full_every: int = 10, ttl: float = 2.0):
+        self.interval = float(interval)
+        self.full_every = max(1, int(full_every))
+        self.ttl = float(ttl)
+        self.refreshes = 0
+        self._lists = {}  # kind -> (signature, [names])
+        self._roots = {}  # kind -> root_signature() when last listed
+        self._checked = {}  # kind -> monotonic time of the last root check
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def root_signature(kind: str):
+        '''mtime of each root only: one stat per root, never a directory listing.'''
+        try:
+            roots = folder_paths.get_folder_paths(kind)
+        except Exception:
+            return None
+        sig = []
+        for root in roots:
+            try:
+                sig.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                sig.append((root, None))
+        return tuple(sig)
+
+    @staticmethod
+    def signature(kind: str):
+        sig = []
+        try:
+            roots = folder_paths.get_folder_paths(kind)
+        except Exception:
+            return None
+        for root in roots:
+            try:
+                sig.append((root, os.stat(root).st_mtime_ns))
+                with os.scandir(root) as it:
+                    for e in it:
+                        if e.is_dir():
+                            sig.append((e.path, e.stat().st_mtime_ns))
+            except OSError:
+                sig.append((root, None))
+        return tuple(sig)
+
+    def _list(self, kind: str):
+        roots = self.root_signature(kind)
+        sig = self.signature(kind)
+        try:
+            names = list(folder_paths.get_filename_list(kind))
+        except Exception:
+            names = []
+        with self._lock:
+            self._lists[kind] = (sig, names)
+            self._roots[kind] = roots
+            self._checked[kind] = time.monotonic()
+            self.refreshes += 1
+        return names
+
+    def get(self, kind: str) -> list:
+        with self._lock:
+            entry = self._lists.get(kind)
+            roots = self._roots.get(kind)
+            checked = self._checked.get(kind, 0.0)
+        self._start()
+        if entry is None:
+            return list(self._list(kind))
+        now = time.monotonic()
+        if now - checked >= self.ttl:
+            with self._lock:
+                self._checked[kind] = now
+            if self.root_signature(kind) != roots:
+                return list(self._list(kind))
+        return list(entry[1])
+
+    def refresh(self, kind=None) -> dict:
+        with self._lock:
+            kinds = [kind] if kind else list(self._lists)
+        return {k: len(self._list(k)) for k in kinds}
+
+    def _start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="cmnl-file-lists", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        tick = 0
+        while True:
+            time.sleep(self.interval)
+            tick += 1
+            with self._lock:
+                known = {k: sig for k, (sig, _) in self._lists.items()}
+            for kind, sig in known.items():
+                try:
+                    if tick % self.full_every == 0 or self.signature(kind) != sig:
+                        self._list(kind)
+                except Exception as e:
+                    print(f"[CornmeisterNL Powerpack] Listing {kind} failed: {e}")
+
+
+# CMNL_LIST_REFRESH_S: background check interval in seconds (default 30, 0 = no thread)
+# CMNL_LIST_TTL_S: minimum seconds between inline root checks in get() (default 2)
+_CMNL_FILE_LISTS = _CmnlFileLists(
+    interval=_cmnl_env_int("CMNL_LIST_REFRESH_S", 30),
+    ttl=_cmnl_env_int("CMNL_LIST_TTL_S", 2),
+)
+
+if _cmnl_prompt_server():
+    from aiohttp import web
+
+    @_cmnl_prompt_server().routes.post("/cmnl_powerpack/lists/refresh")
+    async def _cmnl_lists_refresh(request):
+        # listing can be slow on network storage: keep it off the event loop
+        import asyncio
+        counts = await asyncio.get_running_loop().run_in_executor(None, _CMNL_FILE_LISTS.refresh)
+        return web.json_response(counts)
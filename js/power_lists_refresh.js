@@ -0,0 +1,37 @@
+import { app } from "../../scripts/app.js";
+import { api } from "../../scripts/api.js";
+import { log } from "./logger.js";
+
+/**
+ * Refresh (R / the Refresh button) re-lists the LoRA + UNet folders on the backend first.
+ *
+ * The PowerPack keeps these file lists in memory; without this the reloaded node
+ * definitions could miss files copied into nested subfolders until the next
+ * background check.
+ */
+
+async function refreshBackendLists() {
+  try {
+    await api.fetchApi("/cmnl_powerpack/lists/refresh", { method: "POST" });
+  } catch (e) {
+    // older backend / offline: the frontend refresh still runs
+  }
+}
+
+app.registerExtension({
+  name: "cornmeisternl.powerpack.lists_refresh",
+
+  setup() {
+    const orig = app.refreshComboInNodes;
+    if (typeof orig !== "function" || orig._cmnlWrapped) return;
+
+    const wrapped = async function (...args) {
+      await refreshBackendLists();
+      return orig.apply(this, args);
+    };
+    wrapped._cmnlWrapped = true;
+    app.refreshComboInNodes = wrapped;
+
+    log("Model list refresh hook loaded");
+  },
+});
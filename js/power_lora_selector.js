@@ -36,6 +36,11 @@ function nextCfgName(node) {
   const inputs = cfgInputs(node);
   return `cfg_${inputs.length + 1}`;
 }
+// "1,3,5" / "2-4" / "1, 4-6" → stack several LoRAs (parsed by the backend)
+function isStackSpec(v) {
+  const s = String(v ?? "").split(":", 1)[0].trim();
+  return /^\d+(\s*-\s*\d+)?(\s*,\s*\d+(\s*-\s*\d+)?)*$/.test(s) && /[,-]/.test(s);
+}
 function updateActiveDropdown(node) {
   ensureActiveCombo(node);
   const w = node.widgets?.find(w => w.name === "active");
@@ -56,10 +61,13 @@ function updateActiveDropdown(node) {
     labels.push(lbl);
   }
   if (!labels.length) labels.push("1: (connect a cfg)");
+  if (cfgs.length > 1) labels.push(`${labels.map(l => l.split(":", 1)[0]).join(",")}: (stack all)`);
+
+  const cur = (w.value ?? "").toString();
+  if (isStackSpec(cur) && !labels.includes(cur)) labels.push(cur);
 
   w.options.values = labels;
 
-  const cur = (w.value ?? "").toString();
   if (!labels.includes(cur)) {
     // try map numeric -> "n: ..."
     const s = cur.includes(":") ? cur.split(":", 1)[0] : cur;
@@ -162,6 +170,24 @@ app.registerExtension({
     };
 
 
+    const origMenu = node.getExtraMenuOptions;
+    node.getExtraMenuOptions = function(canvas, options) {
+      if (origMenu) origMenu.call(this, canvas, options);
+      options.push({
+        content: "Stack LoRAs…",
+        callback: () => {
+          const w = this.widgets?.find(w => w.name === "active");
+          if (!w) return;
+          const v = prompt("LoRAs to stack (e.g. 1,3,5 or 2-4)", isStackSpec(w.value) ? w.value : "");
+          if (v == null) return;
+          if (v.trim() && !isStackSpec(v.trim()) && !/^\d+$/.test(v.trim())) return;
+          w.value = v.trim() || "1";
+          updateActiveDropdown(this);
+          this.setDirtyCanvas(true, true);
+        },
+      });
+    };
+
     // Live refresh labels (handles trigger edits after connections)
     node.onDrawForeground = function(ctx) {
       const now = Date.now();
@@ -78,10 +78,15 @@ function updateTriggerLabel(node) {
   } catch {}
 }
 
+const TEXT_CONCAT_CLASSES = new Set([
+  "CornmeisterNL_PowerTextConcat",
+  "CornmeisterNL_PowerTextConcatBatch",
+]);
+
 app.registerExtension({
   name: "cornmeisternl.powerpack.power_text_concat",
   async nodeCreated(node) {
-    if (node.comfyClass !== "CornmeisterNL_PowerTextConcat") return;
+    if (!TEXT_CONCAT_CLASSES.has(node.comfyClass)) return;
 
     ensureTriggerAndText1(node);
     updateTriggerLabel(node);
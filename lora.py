@@ -0,0 +1,516 @@
+"""Power LoRA Configurator / Selector, with the LoRA file cache, prefetcher and patch memo."""
+
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import folder_paths
+
+from .common import LORA_CFG, _CMNL_FILE_LISTS, _cmnl_env_int, _cmnl_file_fingerprint, _cmnl_prompt_server
+from .metrics import _CMNL_METRICS
+
+
+def _loras_list():
+    return ["(none)"] + _CMNL_FILE_LISTS.get("loras")
+
+
+class _CmnlLoraCache:
+    '''
+    Process-wide LRU cache of parsed LoRA state dicts.
+    - keyed by (path, mtime, size): an edited file on disk is a miss
+    - byte budget with LRU eviction (0 disables caching)
+    - memory: "off" | "pinned" | "shared" (pinned falls back to shared without CUDA)
+    '''
+
+    def __init__(self, max_bytes: int, memory: str = "off"):
+        self.max_bytes = int(max_bytes)
+        self.memory = memory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (state_dict, nbytes)
+        self._loading = {}  # key -> Event, so a file is never read twice at once
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes=None, memory=None):
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = int(max_bytes)
+            if memory is not None:
+                self.memory = memory
+            self._evict_locked()
+
+    @staticmethod
+    def key(path: str):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _nbytes(sd) -> int:
+        total = 0
+        for t in sd.values():
+            try:
+                total += t.numel() * t.element_size()
+            except AttributeError:
+                continue
+        return total
+
+    def _place(self, sd):
+        if self.memory not in ("pinned", "shared"):
+            return sd
+        import torch
+        pin = self.memory == "pinned" and torch.cuda.is_available()
+        out = {}
+        for k, t in sd.items():
+            if isinstance(t, torch.Tensor) and t.device.type == "cpu":
+                try:
+                    t = t.pin_memory() if pin else t.share_memory_()
+                except Exception:
+                    pass
+            out[k] = t
+        return out
+
+    def _evict_locked(self):
+        while self._entries and self.bytes > self.max_bytes:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+    def __contains__(self, path: str) -> bool:
+        try:
+            key = self.key(path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._entries or key in self._loading
+
+    def get(self, path: str, prefetch: bool = False):
+        key = self.key(path)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    if not prefetch:
+                        self.hits += 1
+                        _CMNL_METRICS.cache("PowerLoraSelector", "lora_file", True)
+                    return entry[0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    if prefetch:
+                        self.prefetched += 1
+                    else:
+                        self.misses += 1
+                        _CMNL_METRICS.cache("PowerLoraSelector", "lora_file", False)
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # someone else is reading this file; wait and look again
+            loading.wait()
+
+        try:
+            import comfy.utils
+            t0 = time.perf_counter()
+            sd = self._place(comfy.utils.load_torch_file(path, safe_load=True))
+            nbytes = self._nbytes(sd)
+            _CMNL_METRICS.add_bytes("PowerLoraSelector", "read", key[2])
+            _CMNL_METRICS.observe("PowerLoraSelector", "prefetch" if prefetch else "lora_read",
+                                  time.perf_counter() - t0)
+            print(f"[⚡ PowerLoraSelector] {'Prefetched' if prefetch else 'Loaded'} {os.path.basename(path)} "
+                  f"({nbytes / 2**20:.1f} MB in {time.perf_counter() - t0:.2f}s)")
+
+            if nbytes <= self.max_bytes:
+                with self._lock:
+                    old = self._entries.pop(key, None)
+                    if old is not None:
+                        self.bytes -= old[1]
+                    self._entries[key] = (sd, nbytes)
+                    self.bytes += nbytes
+                    self._evict_locked()
+            return sd
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            loading.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "memory": self.memory,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "prefetched": self.prefetched,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Budget/placement via env: CMNL_LORA_CACHE_MB (default 2048, 0 = off),
+# CMNL_LORA_CACHE_MEMORY (off | pinned | shared)
+_CMNL_LORA_CACHE = _CmnlLoraCache(
+    max_bytes=_cmnl_env_int("CMNL_LORA_CACHE_MB", 2048) * 2**20,
+    memory=(os.environ.get("CMNL_LORA_CACHE_MEMORY") or "off").strip().lower(),
+)
+_CMNL_METRICS.register_stats("lora_cache", _CMNL_LORA_CACHE.stats)
+
+
+class _CmnlLoraPrefetcher:
+    '''
+    Reads LoRA files named by queued PowerLoraConfigurator nodes into the
+    LoRA cache on a small thread pool, before PowerLoraSelector needs them.
+    - bounded concurrency (workers)
+    - memory cap: cached + in-flight bytes never exceed max_bytes
+    - the on-prompt handler only collects names; path lookups and stats run on the pool,
+      so slow (network) model storage never blocks the server's event loop
+    '''
+
+    CONFIGURATOR = "CornmeisterNL_PowerLoraConfigurator"
+
+    def __init__(self, cache, workers: int, max_bytes: int):
+        self.cache = cache
+        self.workers = max(1, int(workers))
+        self.max_bytes = int(max_bytes)
+        self.skipped = 0
+        self._pending = {}  # path -> file size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cmnl-lora-prefetch")
+        return self._pool
+
+    @classmethod
+    def lora_names(cls, prompt) -> list:
+        names = []
+        if not isinstance(prompt, dict):
+            return names
+        for node in prompt.values():
+            if not isinstance(node, dict) or node.get("class_type") != cls.CONFIGURATOR:
+                continue
+            name = (node.get("inputs") or {}).get("lora")
+            # linked inputs arrive as [node_id, slot]; only plain names can be prefetched
+            if isinstance(name, str) and name and name != "(none)" and name not in names:
+                names.append(name)
+        return names
+
+    def submit(self, names) -> int:
+        '''Resolve names and queue the loads that fit (filesystem calls: run it off the event loop).'''
+        queued = 0
+        for name in names:
+            try:
+                path = folder_paths.get_full_path("loras", name)
+                if not path or path in self.cache:
+                    continue
+                size = os.path.getsize(path)
+            except Exception:
+                continue
+            with self._lock:
+                if path in self._pending:
+                    continue
+                limit = min(self.max_bytes, self.cache.max_bytes)
+                if self.cache.bytes + sum(self._pending.values()) + size > limit:
+                    self.skipped += 1
+                    continue
+                self._pending[path] = size
+            self._executor().submit(self._load, path)
+            queued += 1
+        return queued
+
+    def _load(self, path: str):
+        try:
+            self.cache.get(path, prefetch=True)
+        except Exception as e:
+            print(f"[⚡ PowerLoraSelector] Prefetch failed for {os.path.basename(path)}: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+
+    def _submit_quietly(self, names):
+        try:
+            self.submit(names)
+        except Exception as e:
+            print(f"[⚡ PowerLoraSelector] Prefetch skipped: {e}")
+
+    def on_prompt(self, json_data):
+        # PromptServer on-prompt handler: must hand json_data back and never raise
+        try:
+            names = self.lora_names(json_data.get("prompt"))
+            if names:
+                self._executor().submit(self._submit_quietly, names)
+        except Exception as e:
+            print(f"[⚡ PowerLoraSelector] Prefetch skipped: {e}")
+        return json_data
+
+
+# CMNL_LORA_PREFETCH (default 1, 0 = off), CMNL_LORA_PREFETCH_WORKERS (default 2),
+# CMNL_LORA_PREFETCH_MB (default: same as the LoRA cache budget)
+_CMNL_LORA_PREFETCHER = _CmnlLoraPrefetcher(
+    _CMNL_LORA_CACHE,
+    workers=_cmnl_env_int("CMNL_LORA_PREFETCH_WORKERS", 2),
+    max_bytes=_cmnl_env_int("CMNL_LORA_PREFETCH_MB", _CMNL_LORA_CACHE.max_bytes // 2**20) * 2**20,
+)
+
+if _cmnl_env_int("CMNL_LORA_PREFETCH", 1) and _CMNL_LORA_CACHE.max_bytes > 0 and _cmnl_prompt_server():
+    _cmnl_prompt_server().add_on_prompt_handler(_CMNL_LORA_PREFETCHER.on_prompt)
+
+
+class _CmnlPatchMemo:
+    '''
+    Bounded memo of patched (MODEL, CLIP) pairs per upstream model.
+    - the memo lives on the base ModelPatcher, so it is dropped with the base model
+    - clip identity is checked through a weakref (no stale id() matches)
+    - key: (clip, lora file signature, strength_model, strength_clip)
+    '''
+
+    _ATTR = "_cmnl_lora_memo"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._owners = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clip_ref(clip):
+        return weakref.ref(clip) if clip is not None else None
+
+    def get(self, model, clip, key):
+        mkey = (id(clip),) + key
+        with self._lock:
+            memo = getattr(model, self._ATTR, None)
+            entry = memo.get(mkey) if memo else None
+            if entry is not None:
+                clip_ref, out = entry
+                if (clip_ref() if clip_ref else None) is clip:
+                    memo.move_to_end(mkey)
+                    self.hits += 1
+                    return out
+                del memo[mkey]
+            self.misses += 1
+            return None
+
+    def put(self, model, clip, key, out):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            memo = getattr(model, self._ATTR, None)
+            if memo is None:
+                memo = OrderedDict()
+                try:
+                    setattr(model, self._ATTR, memo)
+                    self._owners.add(model)
+                except (AttributeError, TypeError):
+                    return
+            memo[(id(clip),) + key] = (self._clip_ref(clip), out)
+            while len(memo) > self.max_entries:
+                memo.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            for owner in list(self._owners):
+                getattr(owner, self._ATTR, {}).clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            owners = list(self._owners)
+            return {
+                "models": len(owners),
+                "entries": sum(len(getattr(o, self._ATTR, ())) for o in owners),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Patched outputs kept per base model: CMNL_LORA_PATCH_MEMO (default 8, 0 = off)
+_CMNL_PATCH_MEMO = _CmnlPatchMemo(_cmnl_env_int("CMNL_LORA_PATCH_MEMO", 8))
+_CMNL_METRICS.register_stats("lora_patch_memo", _CMNL_PATCH_MEMO.stats)
+
+
+def _cmnl_parse_active(active, max_index: int = 50):
+    '''
+    Parse the selector's active value into cfg indices (in order, no duplicates).
+    Accepts "3", "3: label", "1,3,5", "2-4" and mixes like "1, 4-6".
+    Anything unparsable falls back to [1]; indices past max_index are ignored.
+    '''
+    s = str(active if active is not None else "")
+    if ':' in s:
+        s = s.split(':', 1)[0]
+    out = []
+    parsed = False
+    for part in s.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                a, b = (min(int(x.strip()), max_index + 1) for x in part.split('-', 1))
+                step = 1 if b >= a else -1
+                rng = range(a, b + step, step)
+            else:
+                rng = (int(part),)
+        except ValueError:
+            continue
+        parsed = True
+        for i in rng:
+            i = max(i, 1)
+            if i <= max_index and i not in out:
+                out.append(i)
+    return out if parsed else [1]
+
+
+def _cmnl_apply_lora_stack(model, clip, loras):
+    '''
+    Apply several LoRAs in one pass: one key map, one MODEL clone and one CLIP
+    clone; every LoRA's patches are added onto the same clones.
+    loras: [(state_dict, strength_model, strength_clip), ...]
+    '''
+    import comfy.lora
+    try:
+        import comfy.lora_convert
+        convert = comfy.lora_convert.convert_lora
+    except ImportError:
+        convert = lambda sd: sd
+
+    key_map = {}
+    if model is not None:
+        key_map = comfy.lora.model_lora_keys_unet(model.model, key_map)
+    if clip is not None:
+        key_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, key_map)
+
+    new_model = model.clone() if model is not None else None
+    new_clip = clip.clone() if clip is not None else None
+    for sd, strength_model, strength_clip in loras:
+        loaded = comfy.lora.load_lora(convert(sd), key_map)
+        if new_model is not None:
+            new_model.add_patches(loaded, strength_model)
+        if new_clip is not None:
+            new_clip.add_patches(loaded, strength_clip)
+    return (new_model, new_clip)
+
+
+class PowerLoraConfigurator:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "lora": (_loras_list(),),
+                "trigger": ("STRING", {"default": ""}),
+                "strength_model": ("FLOAT", {"default": 1.0, "min": -5.0, "max": 5.0, "step": 0.05}),
+                "strength_clip": ("FLOAT", {"default": 1.0, "min": -5.0, "max": 5.0, "step": 0.05}),
+            }
+        }
+
+    RETURN_TYPES = (LORA_CFG,)
+    RETURN_NAMES = ("cfg",)
+    FUNCTION = "run"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/LoRA"
+
+    @classmethod
+    def IS_CHANGED(cls, lora="(none)", **kwargs):
+        # the LoRA file's path/mtime/size: an edited file re-runs this node and every selector after it
+        return _cmnl_file_fingerprint("loras", lora)
+
+    def run(self, lora, trigger, strength_model, strength_clip):
+        if lora == "(none)":
+            lora = ""
+        return ({
+            "lora": lora,
+            "trigger": (trigger or "").strip(),
+            "strength_model": float(strength_model),
+            "strength_clip": float(strength_clip),
+        },)
+
+
+class PowerLoraSelector:
+    # Keep UI clean: only show cfg_1; accept cfg_2..cfg_50 as hidden for validation
+    _HIDDEN_CFG = {f"cfg_{i}": (LORA_CFG,) for i in range(2, 51)}
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        # active is STRING; frontend turns it into a combo showing trigger labels
+        # active may also be a stack spec ("1,3,5", "2-4") to apply several LoRAs at once
+        hidden_cfg = cls._HIDDEN_CFG
+        return {
+            "required": {
+                "model": ("MODEL",),
+                "clip": ("CLIP",),
+                "active": ("STRING", {"default": "1"}),
+            },
+            "optional": {
+                "cfg_1": (LORA_CFG,),
+            },
+            "hidden": hidden_cfg,
+        }
+
+    RETURN_TYPES = ("MODEL", "CLIP", "STRING")
+    RETURN_NAMES = ("model", "clip", "trigger")
+    FUNCTION = "run"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/LoRA"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # cfg_N are always links (never passed here) and their configurators fingerprint the
+        # LoRA files; `active` is in the input signature already
+        return ""
+
+    def run(self, model, clip, active, **kwargs):
+        selected = []
+        for idx in _cmnl_parse_active(active):
+            cfg = kwargs.get(f"cfg_{idx}", None)
+            if isinstance(cfg, dict):
+                selected.append(cfg)
+
+        out_model = model
+        out_clip = clip
+        triggers = []
+        stack = []
+
+        for cfg in selected:
+            lora_name = cfg.get("lora", "") or ""
+            trig = (cfg.get("trigger", "") or "").strip()
+            if trig:
+                triggers.append(trig)
+            if lora_name:
+                lora_path = folder_paths.get_full_path("loras", lora_name)
+                stack.append((
+                    lora_path,
+                    float(cfg.get("strength_model", 1.0)),
+                    float(cfg.get("strength_clip", 1.0)),
+                ))
+
+        if stack:
+            memo_key = tuple((_CMNL_LORA_CACHE.key(p), sm, sc) for p, sm, sc in stack)
+            memoized = _CMNL_PATCH_MEMO.get(model, clip, memo_key)
+            _CMNL_METRICS.cache("PowerLoraSelector", "patch_memo", memoized is not None)
+            if memoized is not None:
+                out_model, out_clip = memoized
+            else:
+                # shallow copies: the cached dicts are shared between runs
+                loras = [(dict(_CMNL_LORA_CACHE.get(p)), sm, sc) for p, sm, sc in stack]
+                with _CMNL_METRICS.phase("PowerLoraSelector", "patch"):
+                    if len(loras) == 1:
+                        import comfy.sd
+                        lora, sm, sc = loras[0]
+                        out_model, out_clip = comfy.sd.load_lora_for_models(model, clip, lora, sm, sc)
+                    else:
+                        out_model, out_clip = _cmnl_apply_lora_stack(model, clip, loras)
+                _CMNL_PATCH_MEMO.put(model, clip, memo_key, (out_model, out_clip))
+
+        return (out_model, out_clip, ", ".join(triggers))
+
@@ -0,0 +1,221 @@
+"""PowerPack metrics: per-node phase timings, bytes and cache lookups (Prometheus text / JSON)."""
+
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+from .common import _cmnl_env_int, _cmnl_prompt_server
+
+# seconds; the last bucket (+Inf) is implicit
+_CMNL_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_CMNL_NOOP = contextlib.nullcontext()
+
+
+class _CmnlMetrics:
+    '''
+    Process-wide metrics for the PowerPack nodes.
+    - phase histograms: (node, phase) -> cumulative-bucket seconds, sum, count
+    - counters: bytes read/written per node, cache hits/misses per node + cache, node errors
+    - cache stats: stats() of registered caches, exported as gauges
+    - disabled (CMNL_METRICS=0, the default): node FUNCTIONs are not wrapped and every
+      record call returns after a single flag check
+    '''
+
+    def __init__(self, enabled: bool):
+        self.enabled = bool(enabled)
+        self._phases = {}  # (node, phase) -> [bucket counts..., +Inf], sum, count
+        self._bytes = {}  # (node, direction) -> bytes
+        self._cache = {}  # (node, cache, "hit" | "miss") -> count
+        self._errors = {}  # node -> count
+        self._stats = {}  # name -> stats() callable
+        self._lock = threading.Lock()
+
+    # -- recording -------------------------------------------------------
+
+    def observe(self, node: str, phase: str, seconds: float):
+        if not self.enabled:
+            return
+        i = bisect.bisect_left(_CMNL_BUCKETS, seconds)
+        with self._lock:
+            entry = self._phases.get((node, phase))
+            if entry is None:
+                entry = self._phases[(node, phase)] = [[0] * (len(_CMNL_BUCKETS) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def phase(self, node: str, phase: str):
+        '''Context manager timing one phase (a shared no-op while disabled).'''
+        if not self.enabled:
+            return _CMNL_NOOP
+        return self._timed(node, phase)
+
+    @contextlib.contextmanager
+    def _timed(self, node, phase):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(node, phase, time.perf_counter() - t0)
+
+    def add_bytes(self, node: str, direction: str, nbytes: int):
+        if not self.enabled or not nbytes:
+            return
+        with self._lock:
+            self._bytes[(node, direction)] = self._bytes.get((node, direction), 0) + int(nbytes)
+
+    def cache(self, node: str, cache: str, hit: bool):
+        if not self.enabled:
+            return
+        key = (node, cache, "hit" if hit else "miss")
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def error(self, node: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._errors[node] = self._errors.get(node, 0) + 1
+
+    def register_stats(self, name: str, fn):
+        self._stats[name] = fn
+
+    def instrument(self, cls):
+        '''Wrap cls.FUNCTION to time every execution as phase "total".'''
+        fname = getattr(cls, "FUNCTION", None)
+        fn = cls.__dict__.get(fname) if fname else None
+        if fn is None or getattr(fn, "_cmnl_instrumented", False):
+            return cls
+        node = cls.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                self.error(node)
+                raise
+            finally:
+                self.observe(node, "total", time.perf_counter() - t0)
+
+        wrapper._cmnl_instrumented = True
+        setattr(cls, fname, wrapper)
+        return cls
+
+    # -- export ----------------------------------------------------------
+
+    def _cache_stats(self) -> dict:
+        out = {}
+        for name, fn in list(self._stats.items()):
+            try:
+                out[name] = fn()
+            except Exception as e:
+                out[name] = {"error": str(e)}
+        return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            phases = {}
+            for (node, phase), (buckets, total, count) in self._phases.items():
+                phases.setdefault(node, {})[phase] = {
+                    "count": count,
+                    "sum_s": total,
+                    "buckets": dict(zip([str(b) for b in _CMNL_BUCKETS] + ["+Inf"], buckets)),
+                }
+            nbytes = {}
+            for (node, direction), n in self._bytes.items():
+                nbytes.setdefault(node, {})[direction] = n
+            cache = {}
+            for (node, name, result), n in self._cache.items():
+                cache.setdefault(node, {}).setdefault(name, {"hit": 0, "miss": 0})[result] = n
+            errors = dict(self._errors)
+        return {
+            "enabled": self.enabled,
+            "phases": phases,
+            "bytes": nbytes,
+            "cache_lookups": cache,
+            "errors": errors,
+            "caches": self._cache_stats(),
+        }
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        def esc(v):
+            return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+    @staticmethod
+    def _flatten(stats: dict, prefix: str = ""):
+        for k, v in stats.items():
+            if isinstance(v, dict):
+                yield from _CmnlMetrics._flatten(v, f"{prefix}{k}_")
+            elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                yield f"{prefix}{k}", v
+
+    def prometheus(self) -> str:
+        lb = self._labels
+        with self._lock:
+            phases = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._phases.items())
+            nbytes = sorted(self._bytes.items())
+            cache = sorted(self._cache.items())
+            errors = sorted(self._errors.items())
+
+        lines = [
+            "# HELP cmnl_phase_seconds Time spent per PowerPack node phase.",
+            "# TYPE cmnl_phase_seconds histogram",
+        ]
+        for (node, phase), (buckets, total, count) in phases:
+            running = 0
+            for le, n in zip([repr(b) for b in _CMNL_BUCKETS] + ["+Inf"], buckets):
+                running += n
+                lines.append(f"cmnl_phase_seconds_bucket{lb(node=node, phase=phase, le=le)} {running}")
+            lines.append(f"cmnl_phase_seconds_sum{lb(node=node, phase=phase)} {total}")
+            lines.append(f"cmnl_phase_seconds_count{lb(node=node, phase=phase)} {count}")
+
+        lines += ["# HELP cmnl_bytes_total Bytes read or written by PowerPack nodes.",
+                  "# TYPE cmnl_bytes_total counter"]
+        lines += [f"cmnl_bytes_total{lb(node=node, direction=d)} {n}" for (node, d), n in nbytes]
+
+        lines += ["# HELP cmnl_cache_lookups_total Cache lookups by PowerPack nodes.",
+                  "# TYPE cmnl_cache_lookups_total counter"]
+        lines += [f"cmnl_cache_lookups_total{lb(node=node, cache=c, result=r)} {n}" for (node, c, r), n in cache]
+
+        lines += ["# HELP cmnl_node_errors_total Node executions that raised.",
+                  "# TYPE cmnl_node_errors_total counter"]
+        lines += [f"cmnl_node_errors_total{lb(node=node)} {n}" for node, n in errors]
+
+        lines += ["# HELP cmnl_cache_stat Current PowerPack cache statistics.",
+                  "# TYPE cmnl_cache_stat gauge"]
+        for name, stats in sorted(self._cache_stats().items()):
+            for stat, value in self._flatten(stats):
+                lines.append(f"cmnl_cache_stat{lb(cache=name, stat=stat)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+
+
+# CMNL_METRICS=1 enables recording; CMNL_METRICS_DUMP=<file> writes the JSON snapshot at exit
+_CMNL_METRICS = _CmnlMetrics(_cmnl_env_int("CMNL_METRICS", 0))
+
+if os.environ.get("CMNL_METRICS_DUMP"):
+    atexit.register(_CMNL_METRICS.dump, os.environ["CMNL_METRICS_DUMP"])
+
+if _cmnl_prompt_server():
+    from aiohttp import web
+
+    @_cmnl_prompt_server().routes.get("/cmnl_powerpack/metrics")
+    async def _cmnl_metrics(request):
+        return web.Response(text=_CMNL_METRICS.prometheus(), content_type="text/plain", charset="utf-8")
+
+    @_cmnl_prompt_server().routes.get("/cmnl_powerpack/metrics.json")
+    async def _cmnl_metrics_json(request):
+        return web.json_response(_CMNL_METRICS.snapshot(), dumps=lambda o: json.dumps(o, default=str))
@@ -0,0 +1,394 @@
+"""Power Diffusion Model Loader, with the resident model cache."""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .common import _CMNL_FILE_LISTS, _cmnl_env_int, _cmnl_file_fingerprint
+from .metrics import _CMNL_METRICS
+
+
+class _CmnlModelCache:
+    '''
+    Keep-resident LRU of loaded diffusion models (PowerDiffusionModelLoader).
+    - keyed by (path, mtime, size, model options)
+    - RAM budget in bytes (ModelPatcher.model_size()); least recently used goes first
+    - emptied when ComfyUI unloads all models (Free model cache / unload_all_models)
+    - counts hits/misses and load time
+    - one load per key: a get() for a model that is still loading (e.g. by the preload
+      thread) waits for it instead of reading the same file a second time
+    '''
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_s = 0.0
+        self.bytes = 0
+        self.loads = {}  # "mode/dtype" -> {"count", "load_s", "rss_delta", "peak_delta"}
+        self._entries = OrderedDict()  # key -> (model, nbytes)
+        self._loading = {}  # key -> [Event, model]; the model is handed to waiters when not kept
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str, model_options: dict):
+        st = os.stat(path)
+        opts = tuple(sorted((k, str(v)) for k, v in (model_options or {}).items()))
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size, opts)
+
+    @staticmethod
+    def _nbytes(model) -> int:
+        try:
+            return int(model.model_size())
+        except Exception:
+            return 0
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return (self.hits / lookups) if lookups else 0.0
+
+    def get(self, key):
+        '''
+        The cached model, or None after a miss: the caller then loads it and must
+        call put() (or abandon() when the load failed) to release the waiters.
+        '''
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    self.misses += 1
+                    self._loading[key] = [threading.Event(), None]
+                    return None
+            # someone else is loading this model; wait and use theirs
+            loading[0].wait()
+            if loading[1] is not None:
+                with self._lock:
+                    self.hits += 1
+                return loading[1]
+
+    def put(self, key, model, load_s: float = 0.0):
+        nbytes = self._nbytes(model)
+        with self._lock:
+            self.load_s += load_s
+            loading = self._loading.pop(key, None)
+            if self.max_bytes > 0 and nbytes <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.bytes -= old[1]
+                self._entries[key] = (model, nbytes)
+                self.bytes += nbytes
+                while self._entries and self.bytes > self.max_bytes:
+                    _, (_, dropped) = self._entries.popitem(last=False)
+                    self.bytes -= dropped
+                    self.evictions += 1
+        if loading is not None:
+            loading[1] = model
+            loading[0].set()
+
+    def abandon(self, key):
+        '''The load after a miss failed: let one waiter try again.'''
+        with self._lock:
+            loading = self._loading.pop(key, None)
+        if loading is not None:
+            loading[0].set()
+
+    def record_load(self, option: str, load_s: float, rss_delta: int, peak_delta: int):
+        '''rss_delta: RSS after - before the load; peak_delta: highest RSS during the load - before.'''
+        with self._lock:
+            rec = self.loads.setdefault(option, {"count": 0, "load_s": 0.0, "rss_delta": 0, "peak_delta": 0})
+            rec["count"] += 1
+            rec["load_s"] += load_s
+            rec["rss_delta"] = max(rec["rss_delta"], rss_delta)
+            rec["peak_delta"] = max(rec["peak_delta"], peak_delta)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_s": self.load_s,
+                "hit_ratio": self.hit_ratio(),
+                "loads": {k: dict(v) for k, v in self.loads.items()},
+            }
+
+
+def _cmnl_default_model_cache_mb() -> int:
+    # a quarter of system RAM when psutil (a ComfyUI dependency) is around
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total // 4 // 2**20)
+    except Exception:
+        return 0
+
+
+def _cmnl_hook_unload_all(cache):
+    '''Drop our resident models whenever ComfyUI unloads all models.'''
+    try:
+        import comfy.model_management as mm
+    except Exception:
+        return
+    orig = getattr(mm, "unload_all_models", None)
+    if orig is None or getattr(orig, "_cmnl_hooked", False):
+        return
+
+    @functools.wraps(orig)
+    def unload_all_models(*args, **kwargs):
+        cache.clear()
+        return orig(*args, **kwargs)
+
+    unload_all_models._cmnl_hooked = True
+    mm.unload_all_models = unload_all_models
+
+
+# CMNL_UNET_CACHE_MB: RAM budget for resident diffusion models (default: 25% of RAM, 0 = off)
+_CMNL_MODEL_CACHE = _CmnlModelCache(
+    _cmnl_env_int("CMNL_UNET_CACHE_MB", _cmnl_default_model_cache_mb()) * 2**20
+)
+_cmnl_hook_unload_all(_CMNL_MODEL_CACHE)
+_CMNL_METRICS.register_stats("model_cache", _CMNL_MODEL_CACHE.stats)
+
+
+_CMNL_WEIGHT_DTYPES = ["default", "fp16", "bf16", "fp8_e4m3fn", "fp8_e4m3fn_fast", "fp8_e5m2"]
+_CMNL_LOAD_MODES = ["default", "mmap"]
+
+
+def _cmnl_weight_options(weight_dtype: str) -> dict:
+    '''model_options for comfy.sd.load_diffusion_model (same mapping as UNETLoader).'''
+    import torch
+
+    if weight_dtype == "fp16":
+        return {"dtype": torch.float16}
+    if weight_dtype == "bf16":
+        return {"dtype": torch.bfloat16}
+    if weight_dtype == "fp8_e4m3fn":
+        return {"dtype": torch.float8_e4m3fn}
+    if weight_dtype == "fp8_e4m3fn_fast":
+        return {"dtype": torch.float8_e4m3fn, "fp8_optimizations": True}
+    if weight_dtype == "fp8_e5m2":
+        return {"dtype": torch.float8_e5m2}
+    return {}
+
+
+def _cmnl_rss() -> int:
+    '''Current RSS in bytes (psutil, else /proc/self/statm); 0 when neither is available.'''
+    try:
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+def _cmnl_maxrss() -> int:
+    '''Process-lifetime RSS high-water mark in bytes; 0 without the resource module.'''
+    try:
+        import resource
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024  # KiB on Linux
+    except Exception:
+        return 0
+
+
+class _CmnlRssPeak:
+    '''
+    Highest RSS while the block runs (one model load), not the process-lifetime peak.
+    - a daemon thread samples RSS every `interval` seconds
+    - the lifetime high-water mark also counts when it rose during the block (spikes between samples)
+    '''
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = float(interval)
+        self.start = self.end = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _cmnl_rss())
+
+    def __enter__(self):
+        self.start = self.peak = _cmnl_rss()
+        self._maxrss0 = _cmnl_maxrss()
+        if self.start:
+            self._thread = threading.Thread(target=self._sample, name="cmnl-rss-peak", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.end = _cmnl_rss()
+        self.peak = max(self.peak, self.end)
+        maxrss = _cmnl_maxrss()
+        if self.start and maxrss > self._maxrss0:
+            self.peak = max(self.peak, maxrss)
+        return False
+
+    @property
+    def delta(self) -> int:
+        return self.end - self.start
+
+    @property
+    def peak_delta(self) -> int:
+        return max(0, self.peak - self.start)
+
+
+def _cmnl_mmap_safetensors(path: str):
+    '''
+    Map a .safetensors file and return (state_dict, metadata) without reading it.
+    - tensors are views on a private (copy-on-write) mapping: pages come in on first touch
+      and stay reclaimable page cache, in-place edits never reach the file
+    - misaligned tensors (rare) are copied so every view is element-aligned
+    '''
+    import json
+    import mmap
+    import struct
+    import torch
+
+    dtypes = {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+        "U8": torch.uint8, "BOOL": torch.bool,
+        "F8_E4M3": getattr(torch, "float8_e4m3fn", None),
+        "F8_E5M2": getattr(torch, "float8_e5m2", None),
+    }
+
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    base = 8 + header_len
+    metadata = header.pop("__metadata__", None)
+    sd = {}
+    for name, info in header.items():
+        dtype = dtypes.get(info["dtype"])
+        if dtype is None:
+            raise RuntimeError(f"{os.path.basename(path)}: unsupported safetensors dtype {info['dtype']} ({name})")
+        begin, end = info["data_offsets"]
+        shape = info["shape"]
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        count = (end - begin) // itemsize
+        if count == 0:
+            sd[name] = torch.empty(shape, dtype=dtype)
+            continue
+        offset = base + begin
+        if offset % itemsize:
+            t = torch.frombuffer(bytearray(mm[offset:base + end]), dtype=dtype)
+        else:
+            t = torch.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+        sd[name] = t.reshape(shape)
+    return sd, metadata
+
+
+def _cmnl_load_diffusion_mmap(path: str, model_options: dict):
+    '''comfy.sd.load_diffusion_model, but fed from a memory-mapped state dict.'''
+    import inspect
+    import comfy.sd
+
+    if path.lower().endswith(".safetensors"):
+        sd, metadata = _cmnl_mmap_safetensors(path)
+    else:
+        import torch
+        sd, metadata = torch.load(path, map_location="cpu", mmap=True, weights_only=True), None
+
+    loader = comfy.sd.load_diffusion_model_state_dict
+    kwargs = {"model_options": model_options}
+    if metadata is not None and "metadata" in inspect.signature(loader).parameters:
+        kwargs["metadata"] = metadata
+    model = loader(sd, **kwargs)
+    if model is None:
+        raise RuntimeError(f"Could not detect model type of: {path}")
+    return model
+
+
+class PowerDiffusionModelLoader:
+    @classmethod
+    def INPUT_TYPES(cls):
+        models = _CMNL_FILE_LISTS.get("unet")
+        if not models:
+            models = ["(no models found)"]
+
+        return {
+            "required": {
+                "model_name": (models, {"default": models[0]}),
+            },
+            "optional": {
+                "weight_dtype": (_CMNL_WEIGHT_DTYPES, {"default": "default"}),
+                "load_mode": (_CMNL_LOAD_MODES, {"default": "default"}),
+            }
+        }
+
+    RETURN_TYPES = ("MODEL", "STRING")
+    RETURN_NAMES = ("model", "model_name")
+    FUNCTION = "load"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/Loaders"
+
+    @classmethod
+    def IS_CHANGED(cls, model_name="", **kwargs):
+        return _cmnl_file_fingerprint("unet", model_name)
+
+    def load(self, model_name, weight_dtype="default", load_mode="default"):
+        import folder_paths
+        import comfy.sd
+
+        if model_name == "(no models found)":
+            raise RuntimeError("No diffusion models found in models/unet")
+
+        model_path = folder_paths.get_full_path("unet", model_name)
+        if not model_path:
+            raise RuntimeError(f"Model not found: {model_name}")
+
+        model_options = _cmnl_weight_options(weight_dtype)
+        key = _CMNL_MODEL_CACHE.key(model_path, dict(model_options, load_mode=load_mode))
+        model = _CMNL_MODEL_CACHE.get(key)
+        _CMNL_METRICS.cache("PowerDiffusionModelLoader", "model", model is not None)
+        if model is not None:
+            print(f"[⚡ PowerDiffusionModelLoader] {model_name}: resident "
+                  f"(hit ratio {_CMNL_MODEL_CACHE.hit_ratio():.0%})")
+            return (model, model_name)
+
+        t0 = time.perf_counter()
+        try:
+            with _CmnlRssPeak() as rss:
+                if load_mode == "mmap":
+                    model = _cmnl_load_diffusion_mmap(model_path, model_options)
+                else:
+                    model = comfy.sd.load_diffusion_model(model_path, model_options=model_options)
+        except BaseException:
+            _CMNL_MODEL_CACHE.abandon(key)
+            raise
+        load_s = time.perf_counter() - t0
+        _CMNL_MODEL_CACHE.put(key, model, load_s)
+        _CMNL_METRICS.observe("PowerDiffusionModelLoader", f"load_{load_mode}", load_s)
+        # mmap maps the file and only pages in what is touched: count it as mapped, not read
+        _CMNL_METRICS.add_bytes("PowerDiffusionModelLoader", "mapped" if load_mode == "mmap" else "read", key[2])
+
+        option = f"{load_mode}/{weight_dtype}"
+        _CMNL_MODEL_CACHE.record_load(option, load_s, rss.delta, rss.peak_delta)
+        print(f"[⚡ PowerDiffusionModelLoader] {model_name}: loaded in {load_s:.2f}s ({option}), "
+              f"RSS {rss.end / 2**30:.2f} GB ({rss.delta / 2**30:+.2f} GB), "
+              f"peak during load {rss.peak_delta / 2**30:+.2f} GB "
+              f"(hit ratio {_CMNL_MODEL_CACHE.hit_ratio():.0%})")
+        return (model, model_name)
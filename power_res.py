@@ -0,0 +1,242 @@
+"""Power Res: preset resolutions and empty latents."""
+
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .common import _cmnl_env_int, _cmnl_prompt_server
+from .metrics import _CMNL_METRICS
+
+
+def _cmnl_round_to(v: int, step: int) -> int:
+    return max(64, int(round(v / float(step))) * step)
+
+
+# latent_format choices → (channels, spatial downscale, latent dims); "auto" asks the MODEL
+_CMNL_LATENT_FORMATS = {
+    "auto": None,
+    "SD1.5/SDXL (4ch)": (4, 8, 2),
+    "SD3/Flux (16ch)": (16, 8, 2),
+}
+
+
+def _cmnl_latent_spec(model, latent_format: str):
+    '''(channels, spatial downscale factor, latent dims) for the latent PowerRes allocates.'''
+    spec = _CMNL_LATENT_FORMATS.get(latent_format)
+    if spec is not None:
+        return spec
+    fmt = None
+    if model is not None:
+        try:
+            fmt = model.get_model_object("latent_format")
+        except Exception:
+            fmt = getattr(getattr(model, "model", None), "latent_format", None)
+    if fmt is None:
+        return (4, 8, 2)
+    return (
+        int(getattr(fmt, "latent_channels", 4)),
+        int(getattr(fmt, "spacial_downscale_ratio", 8)),
+        int(getattr(fmt, "latent_dimensions", 2)),
+    )
+
+
+class _CmnlZeroLatents:
+    '''
+    Reusable empty latents: one [1, C, ...] zeros tensor per shape/device/dtype,
+    handed out expanded to the batch size (no new allocation per run).
+    A base that was modified in place (tensor _version moved) is replaced.
+    '''
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (tensor, version)
+        self._lock = threading.Lock()
+
+    def get(self, batch: int, shape, device, dtype):
+        import torch
+
+        key = (tuple(shape), str(device), dtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0]._version != entry[1]:
+                self.misses += 1
+                hit = False
+                base = torch.zeros([1, *shape], device=device, dtype=dtype)
+                entry = self._entries[key] = (base, base._version)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self.hits += 1
+                hit = True
+            self._entries.move_to_end(key)
+        _CMNL_METRICS.cache("PowerRes", "zero_latent", hit)
+        return entry[0].expand(int(batch), *shape)
+
+
+_CMNL_ZERO_LATENTS = _CmnlZeroLatents()
+
+def _cmnl_load_res_presets(pdir=None):
+    '''Load all presets from presets/*.json inside this package.'''
+    if pdir is None:
+        pdir = os.path.join(os.path.dirname(__file__), "presets")
+    presets = {}
+    if not os.path.isdir(pdir):
+        return presets
+    files = sorted(glob.glob(os.path.join(pdir, "*.json")))
+    for fp in files:
+        try:
+            with open(fp, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                for k, v in data.items():
+                    if isinstance(k, str) and isinstance(v, (list, tuple)) and len(v) == 2:
+                        try:
+                            w = int(v[0])
+                            h = int(v[1])
+                            if w > 0 and h > 0:
+                                presets[k] = (w, h)
+                        except Exception:
+                            continue
+        except Exception as e:
+            print(f"[CornmeisterNL Powerpack] Failed to load presets from {fp}: {e}")
+    return presets
+
+
+class _CmnlPresetRegistry:
+    '''
+    Parsed presets/*.json, re-read only when the folder changes.
+    - signature: directory mtime + (name, mtime, size) of every json file
+    - check() re-stats at most once per `interval` seconds
+    - presets: plain dict snapshot, lookups never touch the filesystem
+    '''
+
+    def __init__(self, pdir: str, interval: float = 2.0):
+        self.pdir = pdir
+        self.interval = float(interval)
+        self.presets = {}
+        self.loads = 0
+        self._signature = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def signature(self):
+        try:
+            dir_mtime = os.stat(self.pdir).st_mtime_ns
+            files = []
+            with os.scandir(self.pdir) as it:
+                for e in it:
+                    if e.name.endswith(".json") and not e.name.startswith(".") and e.is_file():
+                        st = e.stat()
+                        files.append((e.name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            return None
+        return (dir_mtime, tuple(sorted(files)))
+
+    def check(self, force: bool = False) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.loads and now - self._checked < self.interval:
+                return self.presets
+            self._checked = now
+            sig = self.signature()
+            if force or not self.loads or sig != self._signature:
+                self.presets = _cmnl_load_res_presets(self.pdir)
+                self._signature = sig
+                self.loads += 1
+            return self.presets
+
+    def reload(self) -> dict:
+        return self.check(force=True)
+
+
+# CMNL_PRESET_CHECK_S: minimum seconds between presets/ folder checks (default 2)
+_CMNL_PRESETS = _CmnlPresetRegistry(
+    os.path.join(os.path.dirname(__file__), "presets"),
+    interval=_cmnl_env_int("CMNL_PRESET_CHECK_S", 2),
+)
+
+if _cmnl_prompt_server():
+    from aiohttp import web
+
+    @_cmnl_prompt_server().routes.post("/cmnl_powerpack/presets/reload")
+    async def _cmnl_presets_reload(request):
+        presets = _CMNL_PRESETS.reload()
+        return web.json_response({"presets": len(presets), "names": list(presets.keys())})
+
+
+class PowerRes:
+    '''
+    Power Res
+    - Presets loaded from presets/*.json
+    - Outputs: LATENT + WIDTH + HEIGHT
+    - Manual override supported
+    '''
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        presets = _CMNL_PRESETS.check()
+        names = list(presets.keys())
+        if not names:
+            names = ["(no presets found)"]
+        return {
+            "required": {
+                "preset": (names, {"default": names[0]}),
+                "manual_override": ("BOOLEAN", {"default": False}),
+                "width": ("INT", {"default": 512, "min": 64, "max": 8192, "step": 8}),
+                "height": ("INT", {"default": 512, "min": 64, "max": 8192, "step": 8}),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 64}),
+            },
+            "optional": {
+                "model": ("MODEL",),
+                "latent_format": (list(_CMNL_LATENT_FORMATS.keys()), {"default": "auto"}),
+                "latent_device": (["cpu", "intermediate"], {"default": "cpu"}),
+            },
+        }
+
+    RETURN_TYPES = ("LATENT", "INT", "INT")
+    RETURN_NAMES = ("LATENT", "WIDTH", "HEIGHT")
+    FUNCTION = "make"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/Latent"
+
+    @classmethod
+    def IS_CHANGED(cls, preset="", manual_override=False, **kwargs):
+        # the preset's current size: editing presets/*.json re-runs the node, other edits don't
+        if manual_override:
+            return ""
+        return repr(_CMNL_PRESETS.check().get(preset))
+
+    def make(self, preset, manual_override, width, height, batch_size,
+             model=None, latent_format="auto", latent_device="cpu"):
+        # snapshot from the last INPUT_TYPES/reload; only loads if nothing was read yet
+        presets = _CMNL_PRESETS.presets if _CMNL_PRESETS.loads else _CMNL_PRESETS.check()
+
+        if (not manual_override) and preset in presets:
+            w, h = presets[preset]
+        else:
+            w, h = int(width), int(height)
+
+        channels, factor, dims = _cmnl_latent_spec(model, latent_format)
+        w = _cmnl_round_to(w, max(8, factor))
+        h = _cmnl_round_to(h, max(8, factor))
+
+        import torch
+
+        device, dtype = "cpu", torch.float32
+        if latent_device == "intermediate":
+            import comfy.model_management as mm
+            device = mm.intermediate_device()
+            if hasattr(mm, "intermediate_dtype"):
+                dtype = mm.intermediate_dtype()
+
+        # video/temporal models (3 latent dims) get a single-frame latent
+        shape = [channels, h // factor, w // factor]
+        if dims == 3:
+            shape.insert(1, 1)
+
+        latent = _CMNL_ZERO_LATENTS.get(int(batch_size), shape, device, dtype)
+        return ({"samples": latent}, w, h)
@@ -0,0 +1,138 @@
+"""Model/LoRA warm-up from preload.json at pack import."""
+
+import os
+import threading
+import time
+
+import folder_paths
+
+from .common import _cmnl_env_int, _cmnl_prompt_server
+from .lora import _CMNL_LORA_CACHE
+from .model_loader import _CMNL_LOAD_MODES, _CMNL_MODEL_CACHE, _CMNL_WEIGHT_DTYPES, PowerDiffusionModelLoader
+
+
+class _CmnlPreloader:
+    '''
+    Warms the model and LoRA caches from a JSON manifest (preload.json in this package).
+    - "models": names under models/unet, or {"name", "weight_dtype", "load_mode"}
+    - "loras": names under models/loras
+    - runs once on a daemon thread at import; ComfyUI startup never waits for it
+    - loads through PowerDiffusionModelLoader / the LoRA cache, so nodes hit what it loaded
+    - route: POST /cmnl_powerpack/preload re-reads the manifest and runs it again
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.loaded = 0
+        self.failed = 0
+        self.elapsed_s = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def manifest(self) -> tuple:
+        if not os.path.isfile(self.path):
+            return [], []
+        import json
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("manifest must be a JSON object with \"models\" and/or \"loras\"")
+
+        models = []
+        for item in data.get("models") or []:
+            if isinstance(item, str):
+                item = {"name": item}
+            if isinstance(item, dict) and isinstance(item.get("name"), str):
+                models.append({
+                    "name": item["name"],
+                    "weight_dtype": item.get("weight_dtype", "default"),
+                    "load_mode": item.get("load_mode", "default"),
+                })
+        loras = [n for n in data.get("loras") or [] if isinstance(n, str) and n]
+        return models, loras
+
+    def _run(self, models, loras):
+        total = len(models) + len(loras)
+        t_start = time.perf_counter()
+        loaded = failed = 0
+        print(f"[CornmeisterNL Powerpack] Preloading {len(models)} model(s), {len(loras)} LoRA(s)")
+
+        jobs = [("model", m["name"], m) for m in models] + [("lora", n, None) for n in loras]
+        for i, (kind, name, opts) in enumerate(jobs, 1):
+            t0 = time.perf_counter()
+            try:
+                if kind == "model":
+                    if opts["weight_dtype"] not in _CMNL_WEIGHT_DTYPES or opts["load_mode"] not in _CMNL_LOAD_MODES:
+                        raise ValueError(f"unknown option {opts['weight_dtype']}/{opts['load_mode']}")
+                    PowerDiffusionModelLoader().load(name, opts["weight_dtype"], opts["load_mode"])
+                else:
+                    path = folder_paths.get_full_path("loras", name)
+                    if not path:
+                        raise FileNotFoundError("not found in models/loras")
+                    _CMNL_LORA_CACHE.get(path, prefetch=True)
+                loaded += 1
+                print(f"[CornmeisterNL Powerpack] Preload {i}/{total}: {kind} {name} "
+                      f"({time.perf_counter() - t0:.2f}s)")
+            except Exception as e:
+                failed += 1
+                print(f"[CornmeisterNL Powerpack] Preload {i}/{total}: {kind} {name} failed: {e}")
+
+        with self._lock:
+            self.loaded += loaded
+            self.failed += failed
+            self.elapsed_s += time.perf_counter() - t_start
+        print(f"[CornmeisterNL Powerpack] Preload finished: {loaded} loaded, {failed} failed "
+              f"in {time.perf_counter() - t_start:.2f}s")
+
+    def start(self) -> bool:
+        try:
+            models, loras = self.manifest()
+        except Exception as e:
+            print(f"[CornmeisterNL Powerpack] Failed to read preload manifest {self.path}: {e}")
+            return False
+        if _CMNL_MODEL_CACHE.max_bytes <= 0 and models:
+            print("[CornmeisterNL Powerpack] Preload: model cache disabled (CMNL_UNET_CACHE_MB=0), skipping models")
+            models = []
+        if _CMNL_LORA_CACHE.max_bytes <= 0 and loras:
+            print("[CornmeisterNL Powerpack] Preload: LoRA cache disabled (CMNL_LORA_CACHE_MB=0), skipping LoRAs")
+            loras = []
+        if not models and not loras:
+            return False
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(models, loras), name="cmnl-preload", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "manifest": self.path,
+                "running": self.running(),
+                "loaded": self.loaded,
+                "failed": self.failed,
+                "elapsed_s": self.elapsed_s,
+            }
+
+
+# CMNL_PRELOAD=0 disables the preload; CMNL_PRELOAD_MANIFEST points at another manifest file
+_CMNL_PRELOADER = _CmnlPreloader(
+    os.environ.get("CMNL_PRELOAD_MANIFEST") or os.path.join(os.path.dirname(__file__), "preload.json")
+)
+if _cmnl_env_int("CMNL_PRELOAD", 1):
+    _CMNL_PRELOADER.start()
+
+if _cmnl_prompt_server():
+    from aiohttp import web
+
+    @_cmnl_prompt_server().routes.post("/cmnl_powerpack/preload")
+    async def _cmnl_preload(request):
+        started = _CMNL_PRELOADER.start()
+        return web.json_response(dict(_CMNL_PRELOADER.stats(), started=started))
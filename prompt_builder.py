@@ -0,0 +1,533 @@
+"""Power Prompt Builder (+ Batch): OpenAI Responses API client with a persistent response cache."""
+
+import email.utils
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import folder_paths
+
+from .common import _cmnl_env_int
+from .metrics import _CMNL_METRICS
+
+
+_CMNL_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+_CMNL_RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_CMNL_HTTP_SESSION = None
+_CMNL_HTTP_LOCK = threading.Lock()
+
+
+def _cmnl_base_url(base_url: str = "") -> str:
+    '''Node input, else CMNL_OPENAI_BASE_URL / OPENAI_BASE_URL, else api.openai.com.'''
+    url = (base_url or "").strip() or (os.environ.get("CMNL_OPENAI_BASE_URL") or "").strip() \
+        or (os.environ.get("OPENAI_BASE_URL") or "").strip() or _CMNL_DEFAULT_BASE_URL
+    return url.rstrip("/")
+
+
+def _cmnl_http_session():
+    '''Shared keep-alive session; CMNL_HTTP_POOL connections per host (default 8).'''
+    global _CMNL_HTTP_SESSION
+    with _CMNL_HTTP_LOCK:
+        if _CMNL_HTTP_SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            pool = max(1, _cmnl_env_int("CMNL_HTTP_POOL", 8))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _CMNL_HTTP_SESSION = session
+        return _CMNL_HTTP_SESSION
+
+
+def _cmnl_retry_after(resp):
+    value = (resp.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _cmnl_post(url, headers, payload, timeout, stream=False):
+    '''
+    POST through the shared session, retrying 429/5xx and connection errors.
+    - a read timeout fails at once: the request may already be processed (and billed)
+    - CMNL_HTTP_RETRIES attempts after the first (default 4)
+    - exponential backoff with full jitter (1s base, 30s cap); Retry-After wins when sent
+    '''
+    import requests
+
+    retries = max(0, _cmnl_env_int("CMNL_HTTP_RETRIES", 4))
+    session = _cmnl_http_session()
+    for attempt in range(retries + 1):
+        backoff = random.uniform(0, min(30.0, 2.0 ** attempt))
+        try:
+            resp = session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+        except requests.ReadTimeout as e:
+            raise RuntimeError(f"OpenAI API read timed out (timeout_s); not retried, the request may already be processed: {e}") from e
+        except requests.ConnectionError as e:  # includes ConnectTimeout
+            if attempt >= retries:
+                raise RuntimeError(f"OpenAI API unreachable after {attempt + 1} attempts: {e}") from e
+            reason, delay = type(e).__name__, backoff
+        else:
+            if resp.status_code not in _CMNL_RETRY_STATUS or attempt >= retries:
+                return resp
+            retry_after = _cmnl_retry_after(resp)
+            reason = f"HTTP {resp.status_code}"
+            delay = min(retry_after, 60.0) if retry_after is not None else backoff
+            resp.close()
+        print(f"[⚡ PowerPromptBuilder] {reason}, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+        time.sleep(delay)
+
+
+class _CmnlResponseCache:
+    '''
+    Persistent cache of prompt-builder responses (SQLite, survives restarts).
+    - content-addressed: sha256 of (url, model, system text, user text, temperature, max tokens)
+    - TTL on age, size budget on stored text (least recently used goes first)
+    - lives under ComfyUI's user directory: cmnl_powerpack/prompt_cache.sqlite3
+    '''
+
+    def __init__(self, path=None, ttl_s: float = 30 * 86400, max_bytes: int = 64 * 2**20):
+        self.path = path
+        self.ttl_s = float(ttl_s)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _db(self):
+        if self._conn is None:
+            if self.path is None:
+                try:
+                    base = folder_paths.get_user_directory()
+                except Exception:
+                    base = os.path.join(os.path.dirname(__file__), ".cache")
+                self.path = os.path.join(base, "cmnl_powerpack", "prompt_cache.sqlite3")
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl_s:
+                db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                db.commit()
+                self.hits += 1
+                return row[0]
+            if row is not None:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key: str, model: str, text: str):
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, created, accessed, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, text, now, now, size),
+            )
+            self._evict_locked(db, now)
+            db.commit()
+
+    def _evict_locked(self, db, now: float):
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_s,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# CMNL_PROMPT_CACHE_TTL_H (default 720 = 30 days), CMNL_PROMPT_CACHE_MB (default 64)
+_CMNL_RESPONSE_CACHE = _CmnlResponseCache(
+    ttl_s=_cmnl_env_int("CMNL_PROMPT_CACHE_TTL_H", 720) * 3600,
+    max_bytes=_cmnl_env_int("CMNL_PROMPT_CACHE_MB", 64) * 2**20,
+)
+_CMNL_METRICS.register_stats("prompt_response_cache", _CMNL_RESPONSE_CACHE.stats)
+
+
+class PowerPromptBuilder:
+    """Power Prompt Builder (OpenAI Responses API)
+
+    Inputs:
+      - base_prompt (TEXT)
+      - instructions (TEXT)
+
+    Output:
+      - TEXT (final prompt)
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        models = [
+            "gpt-5.2-chat-latest",
+            "gpt-5.2",
+            "gpt-5.2-pro",
+            "gpt-5.1",
+            "gpt-5-mini",
+            "gpt-5-nano",
+            "custom..."
+        ]
+        return {
+            "required": {
+                "base_prompt": ("STRING", {"multiline": True, "default": ""}),
+                "instructions": ("STRING", {"multiline": True, "default": ""}),
+                "model": (models, {"default": "gpt-5.1"}),
+                "custom_model": ("STRING", {"default": ""}),
+                "temperature": ("FLOAT", {"default": 0.7, "min": 0.0, "max": 2.0, "step": 0.05}),
+                "max_output_tokens": ("INT", {"default": 900, "min": 16, "max": 8192, "step": 16}),
+                "force_clean_output": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                "api_key_override": ("STRING", {"default": ""}),
+                "bypass_cache": ("BOOLEAN", {"default": False}),
+                "stream": ("BOOLEAN", {"default": False}),
+                "base_url": ("STRING", {"default": ""}),
+                "timeout_s": ("INT", {"default": 120, "min": 5, "max": 600}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("TEXT",)
+    FUNCTION = "run"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/Text"
+
+    @classmethod
+    def IS_CHANGED(cls, base_prompt="", instructions="", model="gpt-5.1", custom_model="", temperature=0.7,
+                   max_output_tokens=900, force_clean_output=True, bypass_cache=False, base_url="", **kwargs):
+        # cacheable when the answer is reproducible: temperature 0, or served from the response cache;
+        # a sampled answer with bypass_cache asks for a fresh call every run
+        if bypass_cache and float(temperature) > 0:
+            return float("nan")
+        return _CMNL_RESPONSE_CACHE.key(_cmnl_base_url(base_url), model, custom_model, instructions, base_prompt,
+                                        float(temperature), int(max_output_tokens), bool(force_clean_output))
+
+    def _get_api_key(self, api_key_override: str):
+        key = (api_key_override or "").strip()
+        if key:
+            return key
+        return (os.environ.get("OPENAI_API_KEY") or "").strip()
+
+    def _extract_text(self, data):
+        if isinstance(data, dict):
+            ot = data.get("output_text")
+            if isinstance(ot, str) and ot.strip():
+                return ot.strip()
+
+            out = data.get("output")
+            if isinstance(out, list):
+                chunks = []
+                for item in out:
+                    if not isinstance(item, dict):
+                        continue
+                    content = item.get("content")
+                    if isinstance(content, list):
+                        for c in content:
+                            if isinstance(c, dict) and c.get("type") in ("output_text", "text"):
+                                t = c.get("text")
+                                if isinstance(t, str) and t.strip():
+                                    chunks.append(t)
+                    t2 = item.get("text")
+                    if isinstance(t2, str) and t2.strip():
+                        chunks.append(t2)
+                if chunks:
+                    return "\n".join(chunks).strip()
+        return ""
+
+    def _read_stream(self, resp):
+        '''Read a Responses API SSE stream; returns as soon as the output text is complete.'''
+        deltas = []
+        try:
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                etype = event.get("type")
+                if etype == "response.output_text.delta":
+                    deltas.append(event.get("delta") or "")
+                elif etype == "response.output_text.done":
+                    return (event.get("text") or "".join(deltas)).strip()
+                elif etype == "response.completed":
+                    return self._extract_text(event.get("response")) or "".join(deltas).strip()
+                elif etype in ("error", "response.failed"):
+                    raise RuntimeError(f"OpenAI API stream error: {event}")
+        finally:
+            resp.close()
+        return "".join(deltas).strip()
+
+    def _settings(self, instructions, model, custom_model, temperature, max_output_tokens, force_clean_output,
+                  api_key_override="", bypass_cache=False, stream=False, base_url="", timeout_s=120):
+        '''Everything about a request except the base prompt (shared by the batch node).'''
+        sys_text = instructions or ""
+        if force_clean_output:
+            sys_text = (sys_text.strip() + "\n\n" if sys_text.strip() else "") +                        "Return ONLY the final image prompt text. No explanations, no bullet points, no markdown, no code fences."
+
+        base = _cmnl_base_url(base_url)
+        return {
+            "model": custom_model.strip() if model == "custom..." else model,
+            "sys_text": sys_text,
+            "temperature": float(temperature),
+            "max_output_tokens": int(max_output_tokens),
+            "base": base,
+            "url": f"{base}/responses",
+            "api_key": self._get_api_key(api_key_override),
+            "bypass_cache": bool(bypass_cache),
+            "stream": bool(stream),
+            "timeout_s": int(timeout_s),
+        }
+
+    def _expand(self, settings, base_prompt, limiter=None):
+        '''One base prompt → final prompt text (response cache first, then the API).'''
+        user_text = base_prompt or ""
+        url = settings["url"]
+
+        payload = {
+            "model": settings["model"],
+            "input": [
+                {"role": "system", "content": [{"type": "input_text", "text": settings["sys_text"]}]},
+                {"role": "user", "content": [{"type": "input_text", "text": user_text}]},
+
+            ],
+            "temperature": settings["temperature"],
+            "max_output_tokens": settings["max_output_tokens"],
+        }
+
+        # identical requests are answered from the response cache (bypass_cache forces a refresh)
+        cache_key = _CMNL_RESPONSE_CACHE.key(url, settings["model"], settings["sys_text"], user_text,
+                                             settings["temperature"], settings["max_output_tokens"])
+        if not settings["bypass_cache"]:
+            try:
+                cached = _CMNL_RESPONSE_CACHE.get(cache_key)
+            except sqlite3.Error as e:
+                print(f"[⚡ PowerPromptBuilder] Response cache unavailable: {e}")
+                cached = None
+            _CMNL_METRICS.cache("PowerPromptBuilder", "response", bool(cached))
+            if cached:
+                return cached
+
+        api_key = settings["api_key"]
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        elif settings["base"] == _CMNL_DEFAULT_BASE_URL:
+            # self-hosted / local endpoints may run without a key; OpenAI itself never does
+            raise RuntimeError("Missing OpenAI API key. Set OPENAI_API_KEY env var or provide api_key_override.")
+
+        if settings["stream"]:
+            payload["stream"] = True
+        if limiter is not None:
+            with _CMNL_METRICS.phase("PowerPromptBuilder", "rate_limit"):
+                limiter.wait()
+        with _CMNL_METRICS.phase("PowerPromptBuilder", "api"):
+            resp = _cmnl_post(url, headers, payload, timeout=(10, settings["timeout_s"]), stream=settings["stream"])
+            if resp.status_code >= 400:
+                try:
+                    err = resp.json()
+                except Exception:
+                    err = {"error": resp.text}
+                resp.close()
+                raise RuntimeError(f"OpenAI API error ({resp.status_code}): {err}")
+
+            if settings["stream"]:
+                text = self._read_stream(resp)
+            else:
+                text = self._extract_text(resp.json())
+        if not text:
+            raise RuntimeError("OpenAI returned an empty response text. Try increasing max_output_tokens or switching model.")
+
+        try:
+            _CMNL_RESPONSE_CACHE.put(cache_key, settings["model"], text)
+        except sqlite3.Error as e:
+            print(f"[⚡ PowerPromptBuilder] Response cache unavailable: {e}")
+        return text
+
+    def run(self, base_prompt, instructions, model, custom_model, temperature, max_output_tokens, force_clean_output, api_key_override="", bypass_cache=False, stream=False, base_url="", timeout_s=120):
+        settings = self._settings(instructions, model, custom_model, temperature, max_output_tokens,
+                                  force_clean_output, api_key_override, bypass_cache, stream, base_url, timeout_s)
+        return (self._expand(settings, base_prompt),)
+
+
+class _CmnlRateLimiter:
+    '''Spaces request starts evenly: at most `per_minute` per minute (0 = unlimited).'''
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _cmnl_parse_prompt_list(values) -> list:
+    '''Base prompts from list items, JSON arrays or newline separated text (blank lines skipped).'''
+    prompts = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            prompts.extend(_cmnl_parse_prompt_list(value))
+            continue
+        text = str(value or "").strip()
+        if not text:
+            continue
+        if text.startswith("["):
+            try:
+                items = json.loads(text)
+            except ValueError:
+                items = None
+            if isinstance(items, list):
+                prompts.extend(str(x).strip() for x in items if str(x).strip())
+                continue
+        prompts.extend(line.strip() for line in text.splitlines() if line.strip())
+    return prompts
+
+
+class PowerPromptBuilderBatch(PowerPromptBuilder):
+    """Power Prompt Builder (Batch)
+
+    Expands many base prompts concurrently with the same settings.
+
+    Inputs:
+      - base_prompts (TEXT: one per line, or a JSON array) and/or base_prompt_list (list input)
+
+    Outputs:
+      - TEXT (list, in input order; a failed item falls back to its base prompt)
+      - errors (one line per failed item, empty when all succeeded)
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        types = super().INPUT_TYPES()
+        required = dict(types["required"])
+        required.pop("base_prompt")
+        optional = dict(types["optional"])
+        optional.pop("stream")
+        return {
+            "required": {
+                "base_prompts": ("STRING", {"multiline": True, "default": ""}),
+                **required,
+                "concurrency": ("INT", {"default": 4, "min": 1, "max": 32}),
+                "requests_per_minute": ("INT", {"default": 0, "min": 0, "max": 10000}),
+            },
+            "optional": {
+                "base_prompt_list": ("STRING", {"forceInput": True}),
+                **optional,
+            },
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("TEXT", "errors")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "run_batch"
+
+    @classmethod
+    def IS_CHANGED(cls, base_prompts=None, base_prompt_list=None, **kwargs):
+        # INPUT_IS_LIST: inputs arrive as lists; settings use their first value, like run_batch
+        first = {k: v[0] if isinstance(v, list) and v else v for k, v in kwargs.items()}
+        first.pop("concurrency", None)
+        first.pop("requests_per_minute", None)
+        prompts = json.dumps([base_prompts, base_prompt_list], ensure_ascii=False, default=str)
+        return super().IS_CHANGED(base_prompt=prompts, **first)
+
+    def run_batch(self, base_prompts, concurrency, requests_per_minute, base_prompt_list=None, **kwargs):
+        # INPUT_IS_LIST: every input arrives as a list; settings use their first value
+        settings = self._settings(**{k: v[0] for k, v in kwargs.items()})
+        prompts = _cmnl_parse_prompt_list(list(base_prompts) + list(base_prompt_list or []))
+        if not prompts:
+            return ([], "")
+
+        limiter = _CmnlRateLimiter(int(requests_per_minute[0]))
+        results = list(prompts)
+        errors = []
+
+        def one(i):
+            try:
+                results[i] = self._expand(settings, prompts[i], limiter)
+            except Exception as e:
+                errors.append((i, str(e)))
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max(1, int(concurrency[0])), thread_name_prefix="cmnl-prompt") as pool:
+            list(pool.map(one, range(len(prompts))))
+
+        errors.sort()
+        if len(errors) == len(prompts):
+            # nothing expanded: don't pass the raw base prompts on as if they were results
+            raise RuntimeError(f"All {len(prompts)} prompts failed; first error: {errors[0][1]}")
+        if errors:
+            print(f"[⚡ PowerPromptBuilder] {len(errors)}/{len(prompts)} prompts failed")
+        return (results, "\n".join(f"{i + 1}: {msg}" for i, msg in errors))
@@ -0,0 +1,696 @@
+"""Power Save Image: share / full-flow outputs with metadata."""
+
+import atexit
+import datetime
+import functools
+import io
+import itertools
+import json
+import os
+import queue
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import folder_paths
+
+from .common import _cmnl_env_int
+from .metrics import _CMNL_METRICS
+from .save_index import _CmnlSaveIndex, _cmnl_index_meta
+
+
+class _CmnlSaveWriter:
+    '''
+    Background writer pool for PowerSaveImage (async_write).
+    - fixed worker threads; submit() blocks while the queue is full (backpressure)
+    - flush() waits for everything queued; runs at interpreter exit
+    - counters: queue depth, jobs, failures, encode/write latency and bytes
+    '''
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.failed = 0
+        self.peak_depth = 0
+        self.encode = {"count": 0, "total_s": 0.0, "max_s": 0.0}
+        self.write = {"count": 0, "total_s": 0.0, "max_s": 0.0}
+        self.bytes_written = 0
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._worker, name=f"cmnl-save-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self):
+        while True:
+            fn = self._queue.get()
+            try:
+                fn()
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[⚡ PowerSaveImage] Background save failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn):
+        self._start()
+        self._queue.put(fn)
+        with self._lock:
+            self.jobs += 1
+            self.peak_depth = max(self.peak_depth, self._queue.qsize())
+
+    def flush(self):
+        if self._threads:
+            self._queue.join()
+
+    def record(self, phase: str, seconds: float, nbytes: int = 0):
+        _CMNL_METRICS.observe("PowerSaveImage", phase, seconds)
+        _CMNL_METRICS.add_bytes("PowerSaveImage", "written", nbytes)
+        with self._lock:
+            stat = self.encode if phase == "encode" else self.write
+            stat["count"] += 1
+            stat["total_s"] += seconds
+            stat["max_s"] = max(stat["max_s"], seconds)
+            self.bytes_written += nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "peak_depth": self.peak_depth,
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "encode": dict(self.encode),
+                "write": dict(self.write),
+                "bytes_written": self.bytes_written,
+            }
+
+
+# async_write pool: CMNL_SAVE_WORKERS (default 2), CMNL_SAVE_QUEUE (default 8 jobs)
+_CMNL_SAVE_WRITER = _CmnlSaveWriter(
+    workers=_cmnl_env_int("CMNL_SAVE_WORKERS", 2),
+    max_queue=_cmnl_env_int("CMNL_SAVE_QUEUE", 8),
+)
+atexit.register(_CMNL_SAVE_WRITER.flush)
+_CMNL_METRICS.register_stats("save_writer", _CMNL_SAVE_WRITER.stats)
+
+class _CmnlFileNames:
+    '''
+    Collision-free output names without listing the output directory.
+    - base(): {prefix}_{ts} for the first save in a second, then {prefix}_{ts}_2, _3, ...
+      (an in-process counter per output directory + prefix; a save takes the next number
+      free in every folder it writes to, so saves of this process never collide)
+    - stage() + link_group(): every file of a save is written to an exclusive-create temp
+      file, then all of them are hard-linked into place under one name, so readers never
+      see a partial file and a name taken by another process is never overwritten
+      (the whole save moves on to {base}-2, -3, ... and its files stay paired)
+    - directory(): resolved output folders, created once per expanded path
+    - both maps are bounded: entries for past seconds / [time(...)] folders are dropped
+    '''
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, int(max_entries))
+        self._counters = {}  # (directory, prefix) -> (ts, last n)
+        self._dirs = OrderedDict()  # (output root, expanded sub path) -> absolute dir
+        self._seq = itertools.count()  # unique temp names, also for saves sharing a base name
+        self._lock = threading.Lock()
+
+    def base(self, prefix: str, ts: str, dirs) -> str:
+        keys = [(d, prefix) for d in dict.fromkeys(dirs) if d is not None]
+        with self._lock:
+            n = 1
+            for key in keys:
+                last_ts, last = self._counters.get(key, (None, 0))
+                if last_ts == ts:
+                    n = max(n, last + 1)
+            if len(self._counters) + len(keys) > self.max_entries:
+                # counters of earlier seconds can't collide anymore
+                self._counters = {k: v for k, v in self._counters.items() if v[0] == ts}
+            for key in keys:
+                self._counters[key] = (ts, n)
+        return f"{prefix}_{ts}" if n == 1 else f"{prefix}_{ts}_{n}"
+
+    def directory(self, root: str, sub: str, make) -> str:
+        key = (root, sub)
+        with self._lock:
+            path = self._dirs.get(key)
+            if path is not None:
+                self._dirs.move_to_end(key)
+                return path
+        path = make()
+        with self._lock:
+            self._dirs[key] = path
+            while len(self._dirs) > self.max_entries:
+                self._dirs.popitem(last=False)
+        return path
+
+    def forget(self, path: str):
+        with self._lock:
+            for key in [k for k, v in self._dirs.items() if v == path]:
+                del self._dirs[key]
+
+    def stage(self, directory: str, name: str, data: bytes) -> str:
+        '''Write data to a hidden temp file next to its final name; returns the temp path.'''
+        tmp = os.path.join(directory, f".{name}.{os.getpid()}.{next(self._seq)}.tmp")
+        try:
+            f = open(tmp, "xb")
+        except FileNotFoundError:
+            # cached output folder was removed meanwhile: create it again
+            self.forget(directory)
+            os.makedirs(directory, exist_ok=True)
+            f = open(tmp, "xb")
+        with f:
+            f.write(data)
+        return tmp
+
+    @staticmethod
+    def discard(tmps):
+        for tmp in tmps:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _link(tmp: str, final: str):
+        '''"linked" / "moved" (tmp is gone), or None when final already exists.'''
+        try:
+            os.link(tmp, final)
+            return "linked"
+        except FileExistsError:
+            return None
+        except OSError:
+            pass
+        # no hard links here (some network/FAT mounts): reserve the name, then replace it
+        try:
+            os.close(os.open(final, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return None
+        os.replace(tmp, final)
+        return "moved"
+
+    @staticmethod
+    def _unpublish(published):
+        for tmp, final, how in published:
+            if how == "moved":
+                os.replace(final, tmp)
+            else:
+                os.unlink(final)
+
+    def link_group(self, base: str, files) -> list:
+        '''
+        Publish staged files [(directory, tail, tmp)] as {directory}/{base}{tail}.
+        The collision suffix is chosen once for the group: when any name is taken,
+        the files linked so far are removed again and all move on to {base}-2{tail}, ...
+        '''
+        try:
+            n = 1
+            while True:
+                stem = base if n == 1 else f"{base}-{n}"
+                published = []
+                for directory, tail, tmp in files:
+                    final = os.path.join(directory, f"{stem}{tail}")
+                    how = self._link(tmp, final)
+                    if how is None:
+                        self._unpublish(published)
+                        break
+                    published.append((tmp, final, how))
+                else:
+                    return [final for _, final, _ in published]
+                n += 1
+        finally:
+            self.discard([tmp for _, _, tmp in files])
+
+
+_CMNL_FILE_NAMES = _CmnlFileNames()
+
+_CMNL_TIME_TOKEN = re.compile(r"\[time\((.*?)\)\]")
+
+# per-directory metadata index (.cmnl_index.sqlite3), see save_index.py
+_CMNL_SAVE_INDEX = _CmnlSaveIndex()
+
+_CMNL_ENCODE_POOL = None
+
+
+def _cmnl_encode_pool():
+    '''Shared pool for encoding a batch in parallel (CMNL_ENCODE_WORKERS, default: CPU count).'''
+    global _CMNL_ENCODE_POOL
+    if _CMNL_ENCODE_POOL is None:
+        from concurrent.futures import ThreadPoolExecutor
+        workers = _cmnl_env_int("CMNL_ENCODE_WORKERS", os.cpu_count() or 4)
+        _CMNL_ENCODE_POOL = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cmnl-encode")
+    return _CMNL_ENCODE_POOL
+
+# Compression profiles → Pillow save options per format
+# (PNG compress_type is the zlib strategy: 1 = Z_FILTERED, 2 = Z_HUFFMAN_ONLY;
+#  WebP method/quality trade encoder effort for size)
+_CMNL_ENCODE_PROFILES = {
+    "fastest": {
+        "png": {"compress_level": 1, "compress_type": 2},
+        "webp": {"method": 0},
+        "webp_lossless": {"quality": 0, "method": 0},
+    },
+    "balanced": {
+        "png": {"compress_level": 4, "compress_type": 1},
+        "webp": {"method": 2},
+        "webp_lossless": {"quality": 25, "method": 1},
+    },
+    "smallest": {
+        "png": {"compress_level": 9, "compress_type": 1},
+        "webp": {"method": 6},
+        "webp_lossless": {"quality": 100, "method": 6},
+    },
+}
+
+
+def _cmnl_png_text_chunk(key: str, text: str) -> bytes:
+    # tEXt when the value fits latin-1 (as PIL does), otherwise uncompressed iTXt
+    try:
+        ctype, data = b"tEXt", key.encode("latin-1") + b"\0" + text.encode("latin-1")
+    except UnicodeEncodeError:
+        ctype, data = b"iTXt", key.encode("latin-1") + b"\0\0\0\0\0" + text.encode("utf-8")
+    crc = zlib.crc32(ctype + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", crc)
+
+
+def _cmnl_png_with_text(png: bytes, texts) -> bytes:
+    '''Insert text chunks into an encoded PNG, right after IHDR (signature 8 + IHDR 25 bytes).'''
+    if png[12:16] != b"IHDR":
+        raise ValueError("Not a PNG stream")
+    return png[:33] + b"".join(_cmnl_png_text_chunk(k, v) for k, v in texts) + png[33:]
+
+
+def _cmnl_json_object(items, indent: int = 2) -> str:
+    '''Assemble a JSON object (json.dump indent style) from already serialized values.'''
+    if not items:
+        return "{}"
+    pad = " " * indent
+    body = ",\n".join(f"{pad}{json.dumps(k)}: {v}" for k, v in items)
+    return "{\n" + body + "\n" + " " * (indent - 2) + "}"
+
+
+class _CmnlFlowJson:
+    '''
+    Prompt/workflow JSON of one save, serialized once (lazily, thread-safe)
+    and reused for every PNG text chunk and the workflow TXT.
+    '''
+
+    def __init__(self, prompt, extra_pnginfo):
+        # prompt is de “prompt graph” dict van ComfyUI
+        self.prompt_obj = prompt if isinstance(prompt, (dict, list)) else None
+        # extra_pnginfo bevat meestal {"workflow": {...}} (kan ook leeg zijn)
+        self.extra = extra_pnginfo if isinstance(extra_pnginfo, dict) else None
+        self.workflow_obj = self.extra.get("workflow", None) if self.extra is not None else None
+        self._text = {}
+        self._lock = threading.Lock()
+
+    def _dumps(self, name, obj):
+        if obj is None:
+            return None
+        with self._lock:
+            text = self._text.get(name)
+            if text is None:
+                text = self._text[name] = json.dumps(obj)
+            return text
+
+    @property
+    def prompt(self):
+        return self._dumps("prompt", self.prompt_obj)
+
+    @property
+    def workflow(self):
+        return self._dumps("workflow", self.workflow_obj)
+
+    def txt(self, parameters: str) -> str:
+        extra = "null"
+        if self.extra is not None:
+            items = []
+            for k, v in self.extra.items():
+                if v is not None and v is self.workflow_obj:
+                    items.append((k, self.workflow))
+                else:
+                    items.append((k, json.dumps(v)))
+            extra = _cmnl_json_object(items, indent=4)
+        return _cmnl_json_object([
+            ("parameters", json.dumps(parameters)),
+            ("prompt", self.prompt or "null"),
+            ("workflow", self.workflow or "null"),
+            ("extra_pnginfo", extra),
+        ])
+
+
+class PowerSaveImage:
+    OUTPUT_NODE = True  # belangrijk: dit is een output node
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),
+
+                "share_output_path": ("STRING", {"default": "output/share"}),
+                "full_output_path": ("STRING", {"default": "output/full"}),
+
+                "save_share_image": ("BOOLEAN", {"default": True}),
+                "save_full_flow": ("BOOLEAN", {"default": False}),
+
+                "filename_prefix": ("STRING", {"default": "power"}),
+                "format": (["PNG", "JPEG", "WEBP", "WEBP (lossless)"], {"default": "PNG"}),
+            },
+            "optional": {
+                "positive_prompt": ("STRING", {"multiline": True, "default": ""}),
+                "negative_prompt": ("STRING", {"multiline": True, "default": ""}),
+                "model_name": ("STRING", {"default": ""}),
+                "seed": ("INT", {"default": 0}),
+                "steps": ("INT", {"default": 0}),
+                "cfg": ("FLOAT", {"default": 0.0}),
+                "sampler": ("STRING", {"default": ""}),
+                "scheduler": ("STRING", {"default": ""}),
+                "width": ("INT", {"default": 0}),
+                "height": ("INT", {"default": 0}),
+                "jpeg_quality": ("INT", {"default": 95, "min": 70, "max": 100}),
+                "webp_quality": ("INT", {"default": 90, "min": 50, "max": 100}),
+                "compression_profile": (list(_CMNL_ENCODE_PROFILES.keys()), {"default": "balanced"}),
+                "async_write": ("BOOLEAN", {"default": False}),
+                "write_index": ("BOOLEAN", {"default": True}),
+            },
+            # ✅ hidden inputs: ComfyUI geeft deze automatisch mee (geen UI veld!)
+            "hidden": {
+                "prompt": "PROMPT",
+                "extra_pnginfo": "EXTRA_PNGINFO",
+            },
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "save"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/Save"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # no backing files: the same image and settings are not saved twice
+        return ""
+
+    def _expand_time_tokens(self, text: str) -> str:
+        """
+        Replace [time(%Y-%m-%d)] style tokens
+        """
+        if "[time(" not in (text or ""):
+            return text or ""
+
+        now = datetime.datetime.now()
+
+        def repl(m):
+            try:
+                return now.strftime(m.group(1))
+            except Exception:
+                return m.group(0)
+
+        return _CMNL_TIME_TOKEN.sub(repl, text)
+
+    def _resolve_path(self, path_str: str) -> str:
+        """
+        Manager-safe path resolver:
+        - always inside ComfyUI output dir
+        - expands [time(...)]
+        - blocks path traversal
+        """
+        base_output = folder_paths.get_output_directory()
+    
+        sub = self._expand_time_tokens((path_str or "").strip()).replace("\\", "/")
+        if not sub:
+            return base_output
+
+        # checked and created once per expanded path (a new [time(...)] value gets its own folder)
+        return _CMNL_FILE_NAMES.directory(base_output, sub, lambda: self._make_dir(base_output, sub))
+
+    @staticmethod
+    def _make_dir(base_output: str, sub: str) -> str:
+        # prevent absolute paths & traversal
+        while sub.startswith("/"):
+            sub = sub[1:]
+        if ".." in sub:
+            raise ValueError("Invalid output path")
+    
+        full_path = os.path.normpath(os.path.join(base_output, sub))
+    
+        if not full_path.startswith(os.path.abspath(base_output)):
+            raise ValueError("Invalid output path")
+    
+        os.makedirs(full_path, exist_ok=True)
+        return full_path
+
+    
+
+    def save(
+        self,
+        image,
+        share_output_path,
+        full_output_path,
+        save_share_image,
+        save_full_flow,
+        filename_prefix,
+        format,
+        positive_prompt="",
+        negative_prompt="",
+        model_name="",
+        seed=0,
+        steps=0,
+        cfg=0.0,
+        sampler="",
+        scheduler="",
+        width=0,
+        height=0,
+        jpeg_quality=95,
+        webp_quality=90,
+        compression_profile="balanced",
+        async_write=False,
+        write_index=True,
+        prompt=None,
+        extra_pnginfo=None,
+    ):
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # IMAGE batch → uint8 snapshot (owned copy, safe to hand to a worker)
+        pixels = self._to_uint8(image)
+
+        # CivitAI/A1111-style parameters string (key: parameters)
+        parameters = (
+            f"{positive_prompt}\n"
+            f"Negative prompt: {negative_prompt}\n"
+            f"Steps: {steps}, Sampler: {sampler}, Schedule type: {scheduler}, "
+            f"CFG scale: {cfg}, Seed: {seed}, Size: {width}x{height}, "
+            f"Model: {model_name}"
+        )
+
+        # resolve (and create) dirs up front so path errors surface on the node
+        share_dir = self._resolve_path(share_output_path) if bool(save_share_image) else None
+        full_dir = self._resolve_path(full_output_path) if bool(save_full_flow) else None
+
+        # unique per second and output folders: saves in the same second don't overwrite each other
+        filename_base = _CMNL_FILE_NAMES.base(filename_prefix, ts, (share_dir, full_dir))
+
+        # batch > 1: one file per image, index-suffixed; a single image keeps the plain name
+        if len(pixels) == 1:
+            tags = [""]
+        else:
+            tags = [f"_{i + 1:02d}" for i in range(len(pixels))]
+
+        encode = {
+            "format": format,
+            "jpeg_quality": int(jpeg_quality),
+            "webp_quality": int(webp_quality),
+            "profile": _CMNL_ENCODE_PROFILES.get(compression_profile, _CMNL_ENCODE_PROFILES["balanced"]),
+        }
+
+        # one compact index row per written image (seed, model, size, prompt hash, ...)
+        meta = None
+        if bool(write_index):
+            meta = _cmnl_index_meta(positive_prompt, model_name, seed, steps, cfg, sampler, scheduler, width, height)
+
+        # prompt/workflow JSON is serialized once per batch, by whichever job needs it first
+        flow = _CmnlFlowJson(prompt, extra_pnginfo)
+        jobs = [
+            functools.partial(
+                self._encode_outputs,
+                pixels[i], parameters, share_dir, full_dir, filename_base, tags[i], encode, flow,
+            )
+            for i in range(len(pixels))
+        ]
+        if full_dir is not None:
+            jobs.append(functools.partial(
+                self._encode_workflow_txt, parameters, full_dir, filename_base, flow,
+            ))
+
+        # files are staged by the jobs and published together, so they share one name
+        if bool(async_write):
+            _CMNL_SAVE_WRITER.submit(functools.partial(self._write_batch, jobs, filename_base, meta))
+        else:
+            self._write_batch(jobs, filename_base, meta)
+
+        # SUPER belangrijk: nooit None returnen bij output node
+        return {}
+
+    @staticmethod
+    def _to_uint8(image):
+        import torch
+
+        # one clamp/scale over the whole batch (on its device), then a single host copy
+        if isinstance(image, torch.Tensor):
+            pixels = (image.detach() * 255.0).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+        else:
+            import numpy as np
+            pixels = np.clip(np.asarray(image) * 255.0, 0, 255).astype(np.uint8)
+        return pixels[None] if pixels.ndim == 3 else pixels
+
+    def _write_batch(self, jobs, filename_base, meta=None):
+        '''Run the encode jobs, then publish every staged file of the save under one name.'''
+        if len(jobs) == 1:
+            staged = jobs[0]()
+        else:
+            # PIL drops the GIL while compressing, so threads encode in parallel
+            futures = [_cmnl_encode_pool().submit(job) for job in jobs]
+            staged, error = [], None
+            for fut in futures:
+                try:
+                    staged += fut.result()
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                _CMNL_FILE_NAMES.discard([entry["tmp"] for entry in staged])
+                raise error
+        return self._publish(filename_base, staged, meta)
+
+    def _publish(self, filename_base, staged, meta=None) -> list:
+        paths = _CMNL_FILE_NAMES.link_group(
+            filename_base, [(entry["dir"], entry["tail"], entry["tmp"]) for entry in staged]
+        )
+        for entry, path in zip(staged, paths):
+            if entry["kind"] is not None:
+                self._index(path, entry["kind"], entry["nbytes"], meta)
+            self._report(entry["label"], path, entry["nbytes"], entry["encode_s"], entry["write_s"])
+        return paths
+
+    @staticmethod
+    def _stage_file(directory: str, filename_base: str, tail: str, data: bytes):
+        '''Write to a hidden temp file; returns (temp path, seconds).'''
+        t0 = time.perf_counter()
+        tmp = _CMNL_FILE_NAMES.stage(directory, f"{filename_base}{tail}", data)
+        elapsed = time.perf_counter() - t0
+        _CMNL_SAVE_WRITER.record("write", elapsed, len(data))
+        return tmp, elapsed
+
+    def _staged(self, directory, filename_base, tail, data, kind, label, encode_s) -> dict:
+        tmp, write_s = self._stage_file(directory, filename_base, tail, data)
+        return {
+            "dir": directory, "tail": tail, "tmp": tmp, "nbytes": len(data),
+            "kind": kind, "label": label, "encode_s": encode_s, "write_s": write_s,
+        }
+
+    @staticmethod
+    def _report(label: str, path: str, nbytes: int, encode_s: float, write_s: float):
+        print(f"[⚡ PowerSaveImage] {label} saved: {path} "
+              f"({nbytes / 1024:.0f} KB, encode {encode_s * 1000:.0f} ms, write {write_s * 1000:.0f} ms)")
+
+    @staticmethod
+    def _index(path: str, kind: str, nbytes: int, meta):
+        if meta is None:
+            return
+        try:
+            _CMNL_SAVE_INDEX.add(path, kind, nbytes, meta)
+        except (sqlite3.Error, OverflowError, ValueError) as e:
+            # the image is on disk; a missing row can be restored with `save_index.py rebuild`
+            print(f"[⚡ PowerSaveImage] Index update failed for {path}: {e}")
+
+    def _encode_outputs(self, img, parameters, share_dir, full_dir, filename_base, tag, encode, flow) -> list:
+        '''Encode one image and stage its share/full files ({filename_base}{tag}...).'''
+        from PIL import Image
+
+        staged = []
+
+        pil_img = Image.fromarray(img)
+        fmt = encode["format"]
+
+        # pixels are compressed once; share/full PNGs only differ in their text chunks
+        png = None
+        png_s = 0.0
+        if full_dir is not None or (share_dir is not None and fmt == "PNG"):
+            t0 = time.perf_counter()
+            buf = io.BytesIO()
+            pil_img.save(buf, "PNG", **encode["profile"]["png"])
+            png = buf.getvalue()
+            png_s = time.perf_counter() - t0
+            _CMNL_SAVE_WRITER.record("encode", png_s)
+
+        # -----------------------------
+        # 1) SHARE IMAGE
+        # -----------------------------
+        if share_dir is not None:
+            t0 = time.perf_counter()
+            if fmt == "PNG":
+                tail = f"{tag}.png"
+                data = _cmnl_png_with_text(png, [("parameters", parameters)])
+            else:
+                exif = pil_img.getexif()
+                exif[0x9286] = parameters  # UserComment
+                buf = io.BytesIO()
+                if fmt == "JPEG":
+                    tail = f"{tag}.jpg"
+                    pil_img.save(buf, "JPEG", quality=encode["jpeg_quality"], exif=exif)
+                else:
+                    tail = f"{tag}.webp"
+                    if fmt == "WEBP (lossless)":
+                        pil_img.save(buf, "WEBP", lossless=True, exif=exif, **encode["profile"]["webp_lossless"])
+                    else:
+                        pil_img.save(buf, "WEBP", quality=encode["webp_quality"], exif=exif, **encode["profile"]["webp"])
+                data = buf.getvalue()
+            encode_s = time.perf_counter() - t0
+            _CMNL_SAVE_WRITER.record("encode", encode_s)
+            if fmt == "PNG":
+                encode_s += png_s
+            staged.append(self._staged(share_dir, filename_base, tail, data, "share", "Share image", encode_s))
+
+        # -----------------------------
+        # 2) FULL FLOW PNG
+        # -----------------------------
+        if full_dir is not None:
+            t0 = time.perf_counter()
+
+            # PNG met embedded prompt/workflow (ComfyUI-stijl); parameters altijd erbij
+            texts = [("parameters", parameters)]
+            if flow.prompt is not None:
+                texts.append(("prompt", flow.prompt))
+            if flow.workflow is not None:
+                texts.append(("workflow", flow.workflow))
+
+            data = _cmnl_png_with_text(png, texts)
+            encode_s = time.perf_counter() - t0
+            _CMNL_SAVE_WRITER.record("encode", encode_s)
+            try:
+                staged.append(self._staged(full_dir, filename_base, f"{tag}_full.png", data, "full", "Full flow",
+                                           encode_s + png_s))
+            except Exception:
+                _CMNL_FILE_NAMES.discard([entry["tmp"] for entry in staged])
+                raise
+        return staged
+
+    def _encode_workflow_txt(self, parameters, full_dir, filename_base, flow) -> list:
+        # TXT dump (prompt + workflow + extra), once per batch
+        t0 = time.perf_counter()
+        txt = flow.txt(parameters).encode("utf-8")
+
+        encode_s = time.perf_counter() - t0
+        _CMNL_SAVE_WRITER.record("encode", encode_s)
+
+        return [self._staged(full_dir, filename_base, "_workflow.txt", txt, None, "Workflow", encode_s)]
@@ -0,0 +1,296 @@
+"""
+Per-directory metadata index for images written by PowerSaveImage.
+
+Each output directory gets a `.cmnl_index.sqlite3` with one compact row per saved
+image (name, seed, steps, cfg, sampler, model, size, prompt hash), so searches don't
+have to open every file. Standard library only, so it also runs as a script:
+
+    python save_index.py query ComfyUI/output/share --seed 42 --model flux1-dev
+    python save_index.py query ComfyUI/output/share --prompt-contains "my trigger"
+    python save_index.py rebuild ComfyUI/output/share --recursive
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+INDEX_NAME = ".cmnl_index.sqlite3"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+_COLUMNS = ("path", "kind", "created", "bytes", "seed", "steps", "cfg", "sampler", "scheduler",
+            "model", "width", "height", "prompt_hash", "prompt")
+_QUERY_FIELDS = ("kind", "seed", "steps", "cfg", "sampler", "scheduler", "model", "width", "height", "prompt_hash")
+
+
+def _cmnl_prompt_hash(prompt: str) -> str:
+    return hashlib.sha256((prompt or "").strip().encode("utf-8")).hexdigest()
+
+
+def _cmnl_index_meta(positive_prompt="", model_name="", seed=0, steps=0, cfg=0.0, sampler="",
+                     scheduler="", width=0, height=0) -> dict:
+    '''The indexed fields of one save (everything but path/kind/bytes).'''
+    prompt = str(positive_prompt or "")
+    return {
+        # TEXT: ComfyUI seeds go up to 2**64-1, past SQLite's signed 64-bit INTEGER
+        "seed": str(int(seed)), "steps": int(steps), "cfg": float(cfg),
+        "sampler": str(sampler or ""), "scheduler": str(scheduler or ""), "model": str(model_name or ""),
+        "width": int(width), "height": int(height),
+        "prompt_hash": _cmnl_prompt_hash(prompt), "prompt": prompt,
+    }
+
+
+def _cmnl_parse_parameters(text: str):
+    '''Index fields from an A1111-style `parameters` string (as PowerSaveImage writes it).'''
+    if not text:
+        return None
+    lines = text.split("\n")
+    settings_at = max((i for i, line in enumerate(lines) if line.startswith("Steps: ")), default=None)
+    if settings_at is None:
+        return None
+    neg_at = next((i for i, line in enumerate(lines[:settings_at]) if line.startswith("Negative prompt: ")),
+                  settings_at)
+    fields = dict(re.findall(r"([A-Z][\w ]*): (.*?)(?=, [A-Z][\w ]*: |$)", lines[settings_at]))
+    size = re.match(r"(\d+)x(\d+)", fields.get("Size", ""))
+
+    def num(key, cast):
+        try:
+            return cast(fields.get(key, 0))
+        except ValueError:
+            return 0
+
+    return _cmnl_index_meta(
+        positive_prompt="\n".join(lines[:neg_at]),
+        model_name=fields.get("Model", ""),
+        seed=num("Seed", int), steps=num("Steps", int), cfg=num("CFG scale", float),
+        sampler=fields.get("Sampler", ""), scheduler=fields.get("Schedule type", ""),
+        width=int(size.group(1)) if size else 0, height=int(size.group(2)) if size else 0,
+    )
+
+
+def _cmnl_png_parameters(path: str):
+    '''The `parameters` text chunk of a PNG, read chunk by chunk up to the first IDAT.'''
+    with open(path, "rb") as f:
+        if f.read(8) != b"\x89PNG\r\n\x1a\n":
+            return None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                return None
+            length, ctype = struct.unpack(">I4s", head)
+            if ctype in (b"IDAT", b"IEND"):
+                return None
+            if ctype not in (b"tEXt", b"iTXt", b"zTXt"):
+                f.seek(length + 4, 1)
+                continue
+            data = f.read(length)
+            f.seek(4, 1)  # crc
+            key, _, rest = data.partition(b"\0")
+            if key != b"parameters":
+                continue
+            if ctype == b"tEXt":
+                return rest.decode("latin-1")
+            if ctype == b"zTXt":
+                return zlib.decompress(rest[1:]).decode("latin-1")
+            compressed, rest = rest[0], rest[2:]
+            _, _, rest = rest.partition(b"\0")  # language tag
+            _, _, rest = rest.partition(b"\0")  # translated keyword
+            return (zlib.decompress(rest) if compressed else rest).decode("utf-8")
+
+
+def _cmnl_exif_parameters(path: str):
+    '''EXIF UserComment of a JPEG/WebP (needs Pillow).'''
+    from PIL import Image
+
+    with Image.open(path) as img:
+        value = img.getexif().get(0x9286)
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return value
+
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS images ("
+    " path TEXT PRIMARY KEY, kind TEXT, created REAL, bytes INTEGER,"
+    " seed TEXT, steps INTEGER, cfg REAL, sampler TEXT, scheduler TEXT, model TEXT,"
+    " width INTEGER, height INTEGER, prompt_hash TEXT, prompt TEXT)"
+)
+
+
+class _CmnlSaveIndex:
+    '''
+    One SQLite index per output directory (append-only rows, keyed by file name).
+    - connections are shared by the save workers and kept open for the `max_open` most
+      recently used directories ([time(...)] folders would otherwise pile up open files)
+    - WAL + synchronous=NORMAL: an append costs no fsync
+    '''
+
+    def __init__(self, max_open: int = 16):
+        self.max_open = max(1, int(max_open))
+        self._dbs = OrderedDict()  # directory -> [connection, lock, closed]
+        self._lock = threading.Lock()
+
+    def _db(self, directory: str):
+        directory = os.path.abspath(directory)
+        evicted = []
+        with self._lock:
+            entry = self._dbs.get(directory)
+            if entry is not None:
+                self._dbs.move_to_end(directory)
+                return entry
+            conn = sqlite3.connect(os.path.join(directory, INDEX_NAME), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            for col in ("seed", "model", "prompt_hash", "created"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS images_{col} ON images ({col})")
+            conn.commit()
+            entry = self._dbs[directory] = [conn, threading.Lock(), False]
+            while len(self._dbs) > self.max_open:
+                evicted.append(self._dbs.popitem(last=False)[1])
+        for old in evicted:
+            self._close(old)
+        return entry
+
+    @staticmethod
+    def _close(entry):
+        with entry[1]:
+            entry[2] = True
+            entry[0].close()
+
+    def _run(self, directory: str, fn):
+        '''fn(connection) under the directory's lock (reopened if it was evicted meanwhile).'''
+        while True:
+            conn, lock, _ = entry = self._db(directory)
+            with lock:
+                if not entry[2]:
+                    return fn(conn)
+
+    def add_many(self, directory: str, rows):
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+
+        def insert(conn):
+            conn.executemany(
+                f"INSERT OR REPLACE INTO images ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(row.get(c) for c in _COLUMNS) for row in rows],
+            )
+            conn.commit()
+
+        self._run(directory, insert)
+
+    def add(self, path: str, kind: str, nbytes: int, meta: dict):
+        row = dict(meta, path=os.path.basename(path), kind=kind, created=time.time(), bytes=int(nbytes))
+        self.add_many(os.path.dirname(path), [row])
+
+    def query(self, directory: str, prompt=None, prompt_contains=None, limit: int = 100, **equals) -> list:
+        '''
+        Rows matching every given field (seed=, model=, sampler=, ...), newest first.
+        - prompt: exact positive prompt (compared by hash)
+        - prompt_contains: substring of the positive prompt (e.g. a LoRA trigger)
+        '''
+        if not os.path.exists(os.path.join(directory, INDEX_NAME)):
+            return []
+        where, args = [], []
+        for key, value in equals.items():
+            if key not in _QUERY_FIELDS:
+                raise ValueError(f"Unknown index field: {key}")
+            if value is not None:
+                where.append(f"{key} = ?")
+                args.append(str(int(value)) if key == "seed" else value)
+        if prompt is not None:
+            where.append("prompt_hash = ?")
+            args.append(_cmnl_prompt_hash(prompt))
+        if prompt_contains:
+            where.append("instr(prompt, ?) > 0")
+            args.append(prompt_contains)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM images"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC LIMIT ?"
+        rows = self._run(directory, lambda conn: conn.execute(sql, args + [int(limit)]).fetchall())
+        out = []
+        for r in rows:
+            row = dict(zip(_COLUMNS, r), path=os.path.join(directory, r[0]))
+            if row["seed"] is not None:
+                row["seed"] = int(row["seed"])
+            out.append(row)
+        return out
+
+    def rebuild(self, directory: str, recursive: bool = False) -> dict:
+        '''(Re)index existing images from their embedded parameters; returns per-directory counts.'''
+        counts = {}
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".")) if recursive else []
+            rows, skipped = [], 0
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTS):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    if name.lower().endswith(".png"):
+                        text = _cmnl_png_parameters(path)
+                    else:
+                        text = _cmnl_exif_parameters(path)
+                    meta = _cmnl_parse_parameters(text)
+                    st = os.stat(path)
+                except Exception:
+                    meta = None
+                if meta is None:
+                    skipped += 1
+                    continue
+                kind = "full" if name.endswith("_full.png") else "share"
+                rows.append(dict(meta, path=name, kind=kind, created=st.st_mtime, bytes=st.st_size))
+            if rows:
+                self.add_many(root, rows)
+            if rows or skipped:
+                counts[root] = {"indexed": len(rows), "skipped": skipped}
+        return counts
+
+    def close(self):
+        with self._lock:
+            entries = list(self._dbs.values())
+            self._dbs.clear()
+        for entry in entries:
+            self._close(entry)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    q = sub.add_parser("query", help="search one output directory's index")
+    q.add_argument("directory")
+    for field, cast in (("seed", int), ("steps", int), ("cfg", float), ("sampler", str), ("scheduler", str),
+                        ("model", str), ("width", int), ("height", int), ("kind", str)):
+        q.add_argument(f"--{field}", type=cast, default=None)
+    q.add_argument("--prompt", default=None, help="exact positive prompt")
+    q.add_argument("--prompt-contains", default=None, help="substring of the positive prompt")
+    q.add_argument("--limit", type=int, default=100)
+
+    r = sub.add_parser("rebuild", help="index existing images from their embedded metadata")
+    r.add_argument("directory")
+    r.add_argument("--recursive", action="store_true", help="also index subdirectories (one index each)")
+
+    args = ap.parse_args(argv)
+    index = _CmnlSaveIndex()
+    if args.cmd == "rebuild":
+        print(json.dumps(index.rebuild(args.directory, args.recursive), indent=2))
+        return
+    equals = {f: getattr(args, f) for f in ("seed", "steps", "cfg", "sampler", "scheduler",
+                                            "model", "width", "height", "kind")}
+    for row in index.query(args.directory, prompt=args.prompt, prompt_contains=args.prompt_contains,
+                           limit=args.limit, **equals):
+        row.pop("prompt")
+        print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Power Text Concat (+ Batch: prompt matrices as list output)"""
+
+import itertools
+import math
+
+
+class PowerTextConcat:
+    @classmethod
+    def INPUT_TYPES(cls):
+        hidden_text = {f"text_{i}": ("STRING", {"forceInput": True}) for i in range(2, 51)}
+        return {
+            "required": {
+                "separator": ("STRING", {"default": ", ", "multiline": False}),
+                "strip_parts": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                "trigger": ("STRING", {"default": ""}),
+                "text_1": ("STRING", {"forceInput": True}),
+            },
+            "hidden": hidden_text,
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("text",)
+    FUNCTION = "run"
+    CATEGORY = "⚡ CornmeisterNL/PowerPack/Text"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # pure function of its inputs: ComfyUI's input signature is the whole fingerprint
+        return ""
+
+    # trigger first, then text_1..text_50 in order
+    _PART_KEYS = ("trigger",) + tuple(f"text_{i}" for i in range(1, 51))
+
+    @staticmethod
+    def _join(separator, strip_parts, values) -> str:
+        parts = []
+        for val in values:
+            if not val:
+                continue
+            val = str(val).strip() if strip_parts else str(val)
+            if val:
+                parts.append(val)
+
+        sep = separator if separator is not None else " "
+        return sep.join(parts)
+
+    def run(self, separator, strip_parts, **kwargs):
+        # trigger is OPTIONAL → veilig ophalen
+        values = [kwargs.get(key) for key in self._PART_KEYS if key in kwargs]
+        return (self._join(separator, strip_parts, values),)
+
+
+class PowerTextConcatBatch(PowerTextConcat):
+    """Power Text Concat (Batch)
+
+    Every input may be a list (list outputs upstream, or one option per line with split_lines);
+    emits one joined text per combination, all in a single execution.
+
+    Modes:
+      - product: every combination (subjects × styles × lighting), first input varies slowest
+      - zip: item i of every list; single values repeat, the shortest list ends the batch
+
+    Combinations are generated lazily and stop at max_count, so a huge product is never built.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        types = super().INPUT_TYPES()
+        return {
+            "required": {
+                **types["required"],
+                "mode": (["product", "zip"], {"default": "product"}),
+                "max_count": ("INT", {"default": 256, "min": 1, "max": 100000}),
+            },
+            "optional": {
+                **types["optional"],
+                "split_lines": ("BOOLEAN", {"default": False}),
+            },
+            "hidden": types["hidden"],
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "INT")
+    RETURN_NAMES = ("texts", "count")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "run_batch"
+
+    @staticmethod
+    def _options(values, split_lines: bool) -> list:
+        # options of one input; an unconnected or empty input contributes a single blank
+        out = []
+        for val in values if isinstance(values, list) else [values]:
+            if split_lines and isinstance(val, str):
+                out.extend(line for line in val.splitlines() if line.strip())
+            elif val is not None:
+                out.append(val)
+        return out or [""]
+
+    def run_batch(self, separator, strip_parts, mode, max_count, split_lines=None, **kwargs):
+        # INPUT_IS_LIST: every input arrives as a list; settings use their first value
+        sep, strip, mode, cap = separator[0], strip_parts[0], mode[0], int(max_count[0])
+        split = bool(split_lines[0]) if split_lines else False
+        columns = [self._options(kwargs[key], split) for key in self._PART_KEYS if key in kwargs]
+        if not columns:
+            return ([], 0)
+
+        if mode == "zip":
+            lengths = [len(c) for c in columns if len(c) > 1]
+            total = min(lengths) if lengths else 1
+            rows = (tuple(c[i] if len(c) > 1 else c[0] for c in columns) for i in range(total))
+        else:
+            total = math.prod(len(c) for c in columns)
+            rows = itertools.product(*columns)
+
+        texts = [self._join(sep, strip, row) for row in itertools.islice(rows, cap)]
+        if total > cap:
+            print(f"[⚡ PowerTextConcat] {mode}: {total} combinations, capped to {cap} (max_count)")
+        return (texts, len(texts))